@@ -0,0 +1,270 @@
+from threading import Thread, Event
+import hoer_live_favorites_updater as updater
+from hoer_live_favorites_updater import CatalogIndex, match_titles_in_batch
+from hoer_live_stand_in import create_server, SESSION_COOKIE
+import argparse
+import json
+import os
+import platform
+import queue
+import random
+import string
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+# Benchmarks for the title matching engines and the favorites pipeline, run with "python benchmark.py".
+# The pipeline runs against the local hoer.live stand-in and a fake YouTube playlist, so no real site is contacted.
+
+months = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+def random_name(generator):
+    words = generator.randint(1, 3)
+    return " ".join("".join(generator.choice(string.ascii_lowercase) for _ in range(generator.randint(3, 9))).title() for _ in range(words))
+
+def generate_catalog_titles(count, generator):
+    titles = []
+    for _ in range(count):
+        title = f"{random_name(generator)} | HÖR - {generator.choice(months)} {generator.randint(1, 28)} / {generator.randint(2017, 2024)}"
+        # Some sets are listed under their label
+        if generator.random() < 0.2:
+            title = f"{random_name(generator)} - {title}"
+        titles.append(title)
+    return titles
+
+def generate_youtube_titles(catalog_titles, generator):
+    # YouTube titles are the catalog titles with the usual differences in spelling and case
+    titles = []
+    for catalog_title in catalog_titles:
+        variant = generator.randint(0, 3)
+        if variant == 0:
+            catalog_title = catalog_title.replace("HÖR", "HOER")
+        elif variant == 1:
+            catalog_title = catalog_title.upper()
+        elif variant == 2:
+            catalog_title = catalog_title.replace(" - ", " – ")
+        titles.append(catalog_title)
+    return titles
+
+def benchmark_matching(title_count, catalog_count, loop_sample_count, seed):
+    generator = random.Random(seed)
+    catalog_titles = generate_catalog_titles(catalog_count, generator)
+    expected_titles = generator.sample(catalog_titles, title_count)
+    youtube_titles = generate_youtube_titles(expected_titles, generator)
+
+    started_at = time.perf_counter()
+    batch_matches = match_titles_in_batch(youtube_titles, catalog_titles, top_k=3)
+    batch_seconds = time.perf_counter() - started_at
+
+    # The per-title matcher is much slower, so it only runs on a sample and is extrapolated
+    catalog = CatalogIndex([{"title": title, "url": ""} for title in catalog_titles])
+    sample = youtube_titles[:loop_sample_count]
+    started_at = time.perf_counter()
+    for title in sample:
+        catalog.match(title, 0.0)
+    loop_seconds = (time.perf_counter() - started_at) * title_count / max(1, len(sample))
+
+    return {"titles": title_count,
+            "catalog_titles": catalog_count,
+            "batch_seconds": round(batch_seconds, 3),
+            "batch_pairs_per_second": round(title_count * catalog_count / batch_seconds),
+            "per_title_seconds_estimate": round(loop_seconds, 3),
+            "batch_top_1_accuracy": round(sum(1 for matches, expected_title in zip(batch_matches, expected_titles)
+                                              if matches and catalog_titles[matches[0][0]] == expected_title) / title_count, 4)}
+
+class FakeVideoUnavailable(Exception):
+    pass
+
+class FakePlaylist:
+    # Replaces pytube's Playlist: serves the generated titles, each one after a delay like a YouTube page request
+    titles = {}
+    latency = 0.0
+
+    def __init__(self, playlist_url):
+        self.title = "Benchmark playlist"
+        self.video_urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in self.titles]
+
+class FakeYouTube:
+    def __init__(self, video_url):
+        self.video_id = video_url.split("v=")[-1]
+
+    @property
+    def title(self):
+        time.sleep(FakePlaylist.latency)
+        return FakePlaylist.titles[self.video_id]
+
+class FakeExtract:
+    @staticmethod
+    def video_id(video_url):
+        return video_url.split("v=")[-1]
+
+    @staticmethod
+    def playlist_id(playlist_url):
+        return playlist_url.split("list=")[-1]
+
+def install_fake_youtube(titles, latency):
+    FakePlaylist.titles = {f"video{index:06d}": title for index, title in enumerate(titles)}
+    FakePlaylist.latency = latency
+    updater.import_pytube = lambda: None
+    updater.Playlist, updater.YouTube, updater.extract = FakePlaylist, FakeYouTube, FakeExtract
+    updater.VideoUnavailable = FakeVideoUnavailable
+    updater._default_clients = {"WEB": None}
+
+def run_http_pipeline(params, worker_count):
+    # The HTTP fast path without a browser, each worker uses a session cookie of the stand-in instead of logging in
+    stop_flag = Event()
+    video_queue = queue.Queue(maxsize=params["pipeline_queue_size"])
+    batch = updater.create_batch(params)
+
+    def run_worker():
+        client = updater.HoerLiveHttpClient(params["hoer_live_url"], [{"name": SESSION_COOKIE, "value": "benchmark"}], "benchmark",
+                                            rate=updater.AdaptiveRate(initial_rate=params["initial_request_rate"],
+                                                                      min_rate=params["min_request_rate"],
+                                                                      max_rate=params["max_request_rate"],
+                                                                      target_latency=params["target_request_latency_seconds"]))
+        database = updater.open_cache_database(params["cache_database"])
+        while True:
+            title = updater.get_video(video_queue, stop_flag)
+            if title is None:
+                break
+            batch.finish_title(title, updater.process_title_over_http(client, database, title, params["resolution_cache_ttl_days"]))
+            updater.record_title_done()
+        database.close()
+
+    threads = [Thread(target=updater.run_playlist_task, args=(params, video_queue, stop_flag, batch))]
+    threads += [Thread(target=run_worker) for _ in range(worker_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def get_process_memory():
+    # Resident memory of this process and the Chrome processes it started, in MB
+    try:
+        import psutil
+    except ImportError:
+        return None
+    process = psutil.Process()
+    processes = [process] + process.children(recursive=True)
+    return round(sum(child.memory_info().rss for child in processes if child.is_running()) / 2 ** 20, 1)
+
+def benchmark_pipeline(mode, title_count, worker_count, site_latency, youtube_latency, chrome_path, seed, lean_browsing=False):
+    # mode is "sequential" (one browser), "parallel" (worker_count browsers) or "http" (HTTP fast path without a browser)
+    if mode != "http" and not chrome_path:
+        return {"skipped": "Chrome or Chromium wasn't found, use --chrome-path"}
+
+    generator = random.Random(seed)
+    titles = generate_catalog_titles(title_count, generator)
+    server = create_server("127.0.0.1", 0, [{"title": title, "artist": updater.describe_set_title(title)["artist"]} for title in titles],
+                           site_latency)
+    Thread(target=server.serve_forever, daemon=True).start()
+    install_fake_youtube(titles, youtube_latency)
+
+    # Every run starts from an empty cache, profile and checkpoint
+    working_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            params = updater.load_configuration(os.path.join(directory, "configuration.json"))
+            params.update(youtube_playlist_url="https://www.youtube.com/playlist?list=benchmark",
+                          hoer_live_url=f"http://127.0.0.1:{server.server_port}/",
+                          hoer_live_username="benchmark",
+                          hoer_live_password="benchmark",
+                          chrome_path=chrome_path,
+                          headless=True,
+                          lean_browsing=lean_browsing,
+                          catalog_file="",
+                          browser_worker_count=1 if mode == "sequential" else worker_count,
+                          # The browsers of one mode mustn't be reused by the next one or outlive the temporary profiles
+                          keep_browsers_open=False,
+                          http_fast_path=mode == "http")
+
+            updater.start_run_report(params["timings_file"])
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            if mode == "http":
+                run_http_pipeline(params, worker_count)
+            else:
+                updater.run_headless(params)
+            seconds = time.perf_counter() - started_at
+            memory = get_process_memory()
+            python_peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            summary = updater.summarize_run_report()
+            updater.start_run_report("")
+        finally:
+            os.chdir(working_directory)
+            server.shutdown()
+            server.server_close()
+
+    return {"titles": title_count,
+            "workers": 1 if mode == "sequential" else worker_count,
+            "site_latency": site_latency,
+            "youtube_latency": youtube_latency,
+            "lean_browsing": lean_browsing,
+            "seconds": round(seconds, 3),
+            "titles_processed": summary["titles"],
+            "titles_per_minute": round(summary["titles"] / seconds * 60, 1),
+            "favorited": len(server.RequestHandlerClass.state.favorites),
+            "memory_mb": memory,
+            "python_peak_memory_mb": round(python_peak_memory / 2 ** 20, 1),
+            "steps": {step: {key: round(value, 4) for key, value in stats.items()} for step, stats in summary["steps"].items()}}
+
+def get_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception as e:
+        return ""
+
+def compare_results(baseline, results, path=""):
+    # Prints the change of every number that is in both result files
+    for key, value in results.items():
+        if key not in baseline:
+            continue
+        if isinstance(value, dict) and isinstance(baseline[key], dict):
+            compare_results(baseline[key], value, f"{path}{key}.")
+        elif isinstance(value, (int, float)) and isinstance(baseline[key], (int, float)) and not isinstance(value, bool):
+            change = f" ({100 * (value - baseline[key]) / baseline[key]:+.1f}%)" if baseline[key] else ""
+            print(f"{path}{key}: {baseline[key]} -> {value}{change}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the hoer.live favorites updater.")
+    parser.add_argument("--benchmarks", default="matching,sequential,parallel,http",
+                        help="comma separated benchmarks to run: matching, sequential, parallel and http")
+    parser.add_argument("--titles", type=int, default=10000, help="number of YouTube titles to match")
+    parser.add_argument("--catalog", type=int, default=10000, help="number of catalog titles to match against")
+    parser.add_argument("--loop-sample", type=int, default=200, help="titles used to estimate the per-title matcher")
+    parser.add_argument("--pipeline-titles", type=int, default=50, help="number of playlist videos processed by the pipeline benchmarks")
+    parser.add_argument("--workers", type=int, default=4, help="browser workers (parallel) or HTTP workers (http)")
+    parser.add_argument("--site-latency", type=float, default=0.05, help="seconds the stand-in waits before every response")
+    parser.add_argument("--youtube-latency", type=float, default=0.05, help="seconds the fake playlist takes per video title")
+    parser.add_argument("--chrome-path", default=updater.find_chrome(), help="Chrome or Chromium for the browser benchmarks")
+    parser.add_argument("--lean", action="store_true", help="run the browser benchmarks with the lean browsing profile")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="JSON file to save the results to")
+    parser.add_argument("--compare", help="JSON results of an earlier version to compare with")
+    args = parser.parse_args()
+
+    benchmarks = args.benchmarks.split(",")
+    results = {"version": get_version(), "python": platform.python_version(), "created_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    if "matching" in benchmarks:
+        results["matching"] = benchmark_matching(args.titles, args.catalog, args.loop_sample, args.seed)
+    pipeline_modes = [mode for mode in ("sequential", "parallel", "http") if mode in benchmarks]
+    if pipeline_modes:
+        results["pipeline"] = {mode: benchmark_pipeline(mode, args.pipeline_titles, args.workers, args.site_latency, args.youtube_latency,
+                                                        args.chrome_path, args.seed, args.lean)
+                               for mode in pipeline_modes}
+    print(json.dumps(results, indent=4))
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if args.compare:
+        with open(args.compare, "r") as file:
+            compare_results(json.load(file), results)
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,115 @@
-from pytube import Playlist
-from pytube.innertube import _default_clients
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import tkinter as tk
-from tkinter import filedialog
-from tkinter import messagebox
-from threading import Thread, Event
+from threading import Thread, Event, Lock, local
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, defaultdict, namedtuple
+from itertools import islice
+from contextlib import contextmanager
+import asyncio
+import functools
 import time
 import os
-import psutil
 import subprocess
-import time
+import shutil
 import logging
+import logging.handlers
+import atexit
+import csv
 import json
-
-def load_configuration():
-    config_file = 'configuration.json'
+import random
+import re
+import sys
+import argparse
+import unicodedata
+import sqlite3
+import queue
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlencode, urlsplit
+from xml.etree import ElementTree
+
+# Heavy third-party modules are imported by the stage that needs them (see import_pytube, import_selenium and import_gui),
+# so the command line mode starts fast and never loads tkinter
+Playlist = YouTube = extract = VideoUnavailable = _default_clients = None
+webdriver = Options = Keys = By = WebDriverWait = EC = TimeoutException = StaleElementReferenceException = None
+tk = filedialog = messagebox = None
+
+def import_pytube():
+    global Playlist, YouTube, extract, VideoUnavailable, _default_clients
+    from pytube import Playlist, YouTube, extract
+    from pytube.exceptions import VideoUnavailable
+    from pytube.innertube import _default_clients
+
+def import_selenium():
+    global webdriver, Options, Keys, By, WebDriverWait, EC, TimeoutException, StaleElementReferenceException
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    from selenium.webdriver.common.keys import Keys
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+def import_gui():
+    global tk, filedialog, messagebox
+    import tkinter as tk
+    from tkinter import filedialog
+    from tkinter import messagebox
+
+def load_configuration(config_file='configuration.json'):
 
     default_config = {
         "chrome_path": "",
         "youtube_playlist_url": "",
+        "youtube_playlist_urls": [],
+        "youtube_playlists_file": "",
+        "batch_results_file": "hoer_live_batch_results.json",
+        "checkpoint_file": "hoer_live_checkpoint.json",
+        "checkpoint_interval_seconds": 30,
         "hoer_live_url": "https://hoer.live/",
         "hoer_live_username": "",
         "hoer_live_password": "",
         "process_full_playlist": bool(1),
-        "playlist_record_limit": 1
+        "playlist_record_limit": 1,
+        "cache_database": "hoer_live_cache.db",
+        "resolution_cache_ttl_days": 30,
+        "resolution_cache_max_entries": 5000,
+        "full_resync": bool(0),
+        "page_load_timeout": 10,
+        "element_timeout": 3,
+        "browser_worker_count": 1,
+        "max_browser_worker_count": 8,
+        "http_fast_path": bool(0),
+        "youtube_fetch_concurrency": 8,
+        "youtube_fetch_retries": 3,
+        "pipeline_queue_size": 100,
+        "catalog_file": "hoer_live_catalog.json",
+        "catalog_match_threshold": 0.8,
+        "timings_file": "hoer_live_timings.jsonl",
+        "headless": bool(0),
+        "title_retries": 3,
+        "initial_request_rate": 2.0,
+        "min_request_rate": 0.2,
+        "max_request_rate": 10.0,
+        "target_request_latency_seconds": 1.5,
+        "target_page_load_seconds": 4.0,
+        "run_timeout_minutes": 0,
+        "stop_grace_seconds": 60,
+        "favorites_prefilter": bool(1),
+        "favorites_path": "my-account/favorites/",
+        "favorites_item_class": "favorites__item",
+        "browser_startup_timeout_seconds": 30,
+        "recycle_browser_after_titles": 200,
+        "recycle_browser_memory_mb": 1500,
+        "spare_browsers": 1,
+        "keep_browsers_open": bool(1),
+        "lean_browsing": bool(0),
+        "speculative_search_tabs": 0,
+        "results_file": "hoer_live_results.jsonl",
+        "results_batch_size": 50,
+        # Fonts and SVGs stay allowed, the icons the automation clicks (member icon, popup close) are drawn with them
+        "blocked_url_patterns": ["*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.avif", "*.ico",
+                                 "*.mp4", "*.webm", "*.m3u8", "*.ts", "*.mp3",
+                                 "*youtube.com/*", "*youtube-nocookie.com/*", "*ytimg.com/*", "*vimeo.com/*", "*vimeocdn.com/*",
+                                 "*googletagmanager.com/*", "*google-analytics.com/*", "*doubleclick.net/*", "*facebook.net/*",
+                                 "*facebook.com/tr*", "*hotjar.com/*"]
     }
 
     try:
@@ -44,6 +125,9 @@ def load_configuration():
         with open(config_file, 'r') as file:
             config = json.load(file)
 
+        # Fill in parameters added in newer versions
+        config = {**default_config, **config}
+
         print_and_log(f"Read params from {config_file}.")
         return config
     except Exception as e:
@@ -54,117 +138,940 @@ def save_configuration(params, file_name="configuration.json"):
     with open(file_name, "w") as f:
         json.dump(params, f)
 
+# Log records are put on a queue by the workers and written to the log file and the console by a background thread, see setup_logging
+log_queue = queue.SimpleQueue()
+log_listener = None
+
 def setup_logging(log_file):
-    logging.basicConfig(
-        filename=log_file,
-        filemode='w',
-        format='%(asctime)s,%(msecs)d %(name)s %(levelname)s %(message)s',
-        datefmt='%H:%M:%S',
-        level=logging.INFO,
-        force=True)
+    global log_listener
+    stop_logging()
+    # Logs are appended so earlier runs of the same playlist are kept
+    file_handler = logging.FileHandler(log_file, mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter('%(asctime)s,%(msecs)d %(name)s %(levelname)s %(message)s', datefmt='%H:%M:%S'))
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.addFilter(lambda record: getattr(record, "console", False))
+    log_listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler)
+    # The handlers format the records, the queue only carries the message
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(handlers=[queue_handler], level=logging.INFO, force=True)
+    log_listener.start()
+    logging.info(f"Run started at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+def stop_logging():
+    # Writes the records still on the queue
+    global log_listener
+    if log_listener is not None:
+        log_listener.stop()
+        log_listener = None
+
+atexit.register(stop_logging)
 
 def print_and_log(text):
-    print(text)
-    logging.info(text)
+    if log_listener is not None:
+        logging.info(text, extra={"console": True})
+    else:
+        print(text)
+        logging.info(text)
 
 def print_and_info(text):
     print("INFO: " + text)
-    # Notify the user
-    messagebox.showinfo("INFO", text)
+    # Notify the user (only when running with the window)
+    if messagebox is not None:
+        messagebox.showinfo("INFO", text)
 
 def print_and_error(text):
     print("ERROR: " + text)
-    # Notify the user
-    messagebox.showerror("ERROR", text)
+    logging.error(text)
+    # Notify the user (only when running with the window)
+    if messagebox is not None:
+        messagebox.showerror("ERROR", text)
+
+def get_debugger_version(port, timeout=1):
+    # The DevTools endpoint answers as soon as the browser accepts debugger connections, whatever the browser's process name is
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as response:
+            return json.loads(response.read().decode("utf-8"))
+    except Exception:
+        return None
+
+def run_chrome_if_not_running(chrome_path, port=9222, user_data_dir="ChromeSession", headless=False, startup_timeout=30):
+    # Returns the started browser process, or None if a browser was already listening on the debugger port
+    if get_debugger_version(port) is not None:
+        print_and_log("Browser already started in debug mode...")
+        return None
 
-def run_chrome_if_not_running(chrome_path):
     # Chrome debugger command line arguments
     params = [
             chrome_path,
-            '--remote-debugging-port=9222',
-            '--user-data-dir=' + os.getcwd() + '/ChromeSession',
-            '--disable-extensions'
+            f'--remote-debugging-port={port}',
+            '--user-data-dir=' + os.getcwd() + '/' + user_data_dir,
+            '--disable-extensions',
+            '--no-first-run',
+            '--no-default-browser-check'
         ]
-    # Loop through all running processes
-    for process in psutil.process_iter(['name', 'cmdline']):
-        try:
-            # Check if the app name matches the process name
-            if process.info['name'] == "chrome.exe":
-                # Check if all specified parameters are in the command line
-                if all(param in process.info['cmdline'] for param in params):
-                    print_and_log("Browser already started in debug mode...")
-                    return
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            # Start the browser in the background without blocking the script
-            subprocess.Popen(params)
-            print_and_log("Starting browser in debug mode...")
-            return
+    if headless:
+        params.append('--headless=new')
     # Start the browser in the background without blocking the script
-    subprocess.Popen(params)
+    process = subprocess.Popen(params, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
     print_and_log("Starting browser in debug mode...")
-    return
 
-def load_website(driver, website_url):
-    driver.get(website_url)
-    # Wait for the page to load
-    time.sleep(1)
+    # Wait until the debugger port is up instead of connecting right away
+    deadline = time.monotonic() + startup_timeout
+    while get_debugger_version(port) is None:
+        if process.poll() is not None:
+            raise RuntimeError(f"The browser exited with code {process.returncode} before opening the debugger port {port}")
+        if time.monotonic() > deadline:
+            process.kill()
+            raise TimeoutError(f"The browser didn't open the debugger port {port} within {startup_timeout} seconds")
+        time.sleep(0.1)
+    return process
+
+# Timing spans of the current run, written as JSON lines to the timings file and summarized by print_run_report
+run_report = {"started_at": time.time(), "file": None, "durations": defaultdict(list), "strategies": defaultdict(lambda: [0, 0]), "titles": 0,
+              "failures": defaultdict(int)}
+run_report_lock = Lock()
+
+def start_run_report(timings_file):
+    with run_report_lock:
+        if run_report["file"] is not None:
+            run_report["file"].close()
+        run_report["started_at"] = time.time()
+        run_report["file"] = open(timings_file, "w", buffering=1) if timings_file else None
+        run_report["durations"].clear()
+        run_report["strategies"].clear()
+        run_report["titles"] = 0
+        run_report["failures"].clear()
+
+def record_span(step, started_at, seconds, success, **fields):
+    span = {"step": step, "started_at": round(started_at, 3), "seconds": round(seconds, 4), "success": success, **fields}
+    with run_report_lock:
+        run_report["durations"][step].append(seconds)
+        if run_report["file"] is not None:
+            run_report["file"].write(json.dumps(span, ensure_ascii=False) + "\n")
+
+@contextmanager
+def timed_step(step, **fields):
+    started_at = time.time()
+    started_at_counter = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        record_span(step, started_at, time.perf_counter() - started_at_counter, success, **fields)
+
+def timed(step):
+    # Decorator recording a span for every call of the function
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed_step(step):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record_strategy_result(strategy, found):
+    with run_report_lock:
+        run_report["strategies"][strategy][0] += 1
+        if found:
+            run_report["strategies"][strategy][1] += 1
+
+def record_failure(kind):
+    with run_report_lock:
+        run_report["failures"][kind] += 1
+
+def record_title_done():
+    with run_report_lock:
+        run_report["titles"] += 1
+
+def get_titles_done():
+    with run_report_lock:
+        return run_report["titles"]
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+def summarize_run_report():
+    # Statistics of the current run, also used by benchmark.py
+    with run_report_lock:
+        durations = {step: sorted(values) for step, values in run_report["durations"].items()}
+        strategies = dict(run_report["strategies"])
+        titles = run_report["titles"]
+        failures = dict(run_report["failures"])
+        elapsed_minutes = (time.time() - run_report["started_at"]) / 60
+
+    return {"steps": {step: {"count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95), "max": values[-1],
+                             "total": sum(values)}
+                      for step, values in durations.items()},
+            "strategies": {strategy: {"attempts": attempts, "hits": hits} for strategy, (attempts, hits) in strategies.items()},
+            "failures": failures,
+            "titles": titles,
+            "elapsed_minutes": elapsed_minutes,
+            "titles_per_minute": titles / max(elapsed_minutes, 1 / 60)}
+
+def print_run_report():
+    summary = summarize_run_report()
+
+    print_and_log("Run report (seconds per step: count, p50, p95, max):")
+    for step, stats in sorted(summary["steps"].items(), key=lambda item: item[1]["total"], reverse=True):
+        print_and_log(f"  {step}: {stats['count']}, {stats['p50']:.2f}, {stats['p95']:.2f}, {stats['max']:.2f}")
+    for strategy, stats in sorted(summary["strategies"].items()):
+        print_and_log(f"  Strategy {strategy}: {stats['hits']}/{stats['attempts']} found ({100 * stats['hits'] / stats['attempts']:.0f}%)")
+    if summary["failures"]:
+        print_and_log("  Failures: " + ", ".join(f"{count} {kind}" for kind, count in sorted(summary["failures"].items())))
+    print_and_log(f"  Processed {summary['titles']} titles in {summary['elapsed_minutes']:.1f} minutes ({summary['titles_per_minute']:.1f} titles/minute).")
+
+# Timeouts (in seconds) used while waiting for the website to react and the document states that count as loaded, see configure_waits
+wait_timeouts = {"page_load": 10, "element": 3, "ready_states": ("complete",)}
+
+def configure_waits(page_load_timeout, element_timeout, page_load_strategy="normal"):
+    wait_timeouts["page_load"] = page_load_timeout
+    wait_timeouts["element"] = element_timeout
+    # With the eager strategy pages are usable once the document is parsed, images and embeds may still be loading
+    wait_timeouts["ready_states"] = ("interactive", "complete") if page_load_strategy == "eager" else ("complete",)
+
+def wait_until(driver, condition, step, timeout=None, required=True):
+    # Every wait is recorded as a "wait <step>" span so the run report shows where the time goes
+    with timed_step("wait " + step):
+        try:
+            return WebDriverWait(driver, timeout or wait_timeouts["element"], poll_frequency=0.1).until(condition)
+        except TimeoutException:
+            # Optional waits (e.g. for transitions) just give up silently
+            if required:
+                raise
+            return False
 
-# Step 1: Get video titles from YouTube playlist
-def get_available_video_titles(playlist_url, playlist_record_limit, stop_flag):
-    # Sets the default client type for pytube (fixes errors when reading some video titles)
-    _default_clients["ANDROID_MOBILE"] = _default_clients["WEB"]
-    
-    # Initialize the playlist
-    playlist = Playlist(playlist_url)
+def page_is_ready(driver):
+    return driver.execute_script("return document.readyState") in wait_timeouts["ready_states"]
 
-    setup_logging(playlist.title + ' playlist log.txt')
+def element_is_stale(element):
+    try:
+        element.is_enabled()
+        return False
+    except StaleElementReferenceException:
+        return True
 
-    print_and_log("Fetching video titles from YouTube playlist...")
-    
-    # List to store available video titles
-    available_videos = []
+def wait_for_page_ready(driver, step):
+    wait_until(driver, page_is_ready, step, wait_timeouts["page_load"])
 
-    video_count = 0
-    
-    for video in playlist.videos:
+# Slowest page load of the title the current thread is working on, it paces the browser (see run_paced)
+page_loads = local()
 
-        if stop_flag.is_set():
-            return available_videos
-        
-        if playlist_record_limit > 0:
-            if video_count == playlist_record_limit:
-                print_and_log(f"Fetched {len(available_videos)} available video titles.")
-                return available_videos
+@contextmanager
+def measure_page_load():
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        page_loads.slowest = max(getattr(page_loads, "slowest", 0.0), time.perf_counter() - started_at)
+
+def wait_for_navigation(driver, old_element, step):
+    # The old page is gone once its elements go stale, then wait for the new one to finish loading
+    with measure_page_load():
+        wait_until(driver, lambda d: element_is_stale(old_element), step, wait_timeouts["page_load"], required=False)
+        wait_for_page_ready(driver, step)
+
+def favorite_icon_changed(favorite_icon, original_class):
+    # The heart icon either changes its class or gets replaced once the favorite is saved
+    def condition(driver):
+        try:
+            return favorite_icon.get_attribute("class") != original_class
+        except StaleElementReferenceException:
+            return True
+    return condition
 
+@timed("load_website")
+def load_website(driver, website_url):
+    with measure_page_load():
+        driver.get(website_url)
+        # Wait for the page to load
+        wait_for_page_ready(driver, "load_website")
+
+def get_search_url(website_url, query):
+    # Same request the toggle-search form sends
+    return urljoin(website_url, "?" + urlencode({"s": query}))
+
+@timed("open_search_results")
+def open_search_results(driver, website_url, query):
+    # Lean browsing: load the results page directly instead of the homepage and the search overlay
+    print_and_log(f"Searching for: {query}")
+    with measure_page_load():
+        driver.get(get_search_url(website_url, query))
+        wait_for_page_ready(driver, "open_search_results")
+
+# Title parsing: YouTube titles look like "Artist | HÖR - Date", "Label - Artist | HÖR - Date" or "A b2b B | HÖR Venue - Date",
+# but come with unicode dashes, emojis, odd spacing and "HOER" instead of "HÖR"
+title_dashes = re.compile(r"[\u2010-\u2015\u2212\ufe58\ufe63\uff0d]")
+title_series_spellings = re.compile(r"\bh(?:oe|ö|o\u0308)r\b", re.IGNORECASE)
+# Only unambiguous collaborations, "&", "and", "x" and commas are also part of single names ("Sandy and the Kids")
+title_artist_separators = re.compile(r"\s+(?:b2b|b3b|vs\.?)\s+", re.IGNORECASE)
+
+ParsedTitle = namedtuple("ParsedTitle", ["text", "artist", "artists", "partners", "label", "series", "venue", "date", "dash_parts"])
+
+def fold_title(title):
+    # Same title with plain dashes, the "HÖR" spelling, no emojis and single spaces
+    text = unicodedata.normalize("NFKC", title)
+    text = "".join(character for character in text if unicodedata.category(character) not in ("So", "Cf") and character != "\ufe0f")
+    text = title_dashes.sub("-", text)
+    text = title_series_spellings.sub("HÖR", text)
+    return " ".join(text.split())
+
+@functools.lru_cache(maxsize=4096)
+def parse_title(title):
+    # Splits a title into its parts, the same title is parsed by every strategy, the cache and the catalog
+    text = fold_title(title)
+    artist, label, series, venue, date = "", "", "", "", ""
+    if "|" in text:
+        left, right = (part.strip() for part in text.split("|", 1))
+        # Dashes inside names ("Jean-Michel", "Berlin-Mitte") aren't separators
+        separator = re.compile(r"\s+-\s*|\s*-\s+")
+        # Right of the pipe: series and venue, then the date after the first dash
+        venue_and_date = separator.split(right, maxsplit=1)
+        if len(venue_and_date) == 2:
+            right, date = (part.strip() for part in venue_and_date)
+        series, _, venue = right.partition(" ")
+        # Left of the pipe: "Label - Artist" or just the artist
+        label_and_artist = separator.split(left, maxsplit=1)
+        if len(label_and_artist) == 2:
+            label, artist = label_and_artist
+        else:
+            artist = left
+    artists = tuple(name for name in title_artist_separators.split(artist) if name)
+    return ParsedTitle(text=text,
+                       artist=artist,
+                       artists=artists,
+                       partners=artists[1:],
+                       label=label,
+                       series=series,
+                       venue=venue,
+                       date=date,
+                       dash_parts=tuple(part.strip() for part in re.split(r"\s*-\s+", text)))
+
+def normalize_title(title):
+    # Titles are compared case-insensitively, without diacritics and with folded dashes and whitespace
+    text = unicodedata.normalize("NFKD", parse_title(title).text.casefold())
+    return "".join(character for character in text if not unicodedata.combining(character))
+
+def open_cache_database(database_file):
+    connection = sqlite3.connect(database_file, timeout=30)
+    # Maps normalized YouTube titles to the hoer.live page they were found on and the search strategy that found it
+    connection.execute("""CREATE TABLE IF NOT EXISTS resolutions (
+                              title TEXT PRIMARY KEY,
+                              url TEXT NOT NULL,
+                              strategy TEXT NOT NULL,
+                              resolved_at REAL NOT NULL,
+                              last_used_at REAL NOT NULL)""")
+    # Ledger of playlist videos processed on previous runs and what happened to them
+    connection.execute("""CREATE TABLE IF NOT EXISTS ledger (
+                              playlist_url TEXT NOT NULL,
+                              video_id TEXT NOT NULL,
+                              title TEXT NOT NULL,
+                              outcome TEXT NOT NULL,
+                              processed_at REAL NOT NULL,
+                              PRIMARY KEY (playlist_url, video_id))""")
+    # Last known listing of each YouTube playlist and the titles of its videos, so later runs only fetch new videos
+    connection.execute("""CREATE TABLE IF NOT EXISTS playlist_snapshots (
+                              playlist_id TEXT PRIMARY KEY,
+                              title TEXT NOT NULL,
+                              listed_at REAL NOT NULL)""")
+    connection.execute("""CREATE TABLE IF NOT EXISTS playlist_snapshot_videos (
+                              playlist_id TEXT NOT NULL,
+                              video_id TEXT NOT NULL,
+                              position INTEGER NOT NULL,
+                              title TEXT,
+                              error TEXT,
+                              fetched_at REAL,
+                              PRIMARY KEY (playlist_id, video_id))""")
+    # Hit rate and cost of each search strategy per title shape, used to try the most promising strategy first
+    connection.execute("""CREATE TABLE IF NOT EXISTS strategy_stats (
+                              shape TEXT NOT NULL,
+                              strategy TEXT NOT NULL,
+                              attempts INTEGER NOT NULL,
+                              hits INTEGER NOT NULL,
+                              seconds REAL NOT NULL,
+                              PRIMARY KEY (shape, strategy))""")
+    connection.commit()
+    return connection
+
+def evict_resolution_cache(connection, ttl_days, max_entries):
+    # Drop entries older than the TTL
+    if ttl_days > 0:
+        connection.execute("DELETE FROM resolutions WHERE resolved_at < ?", (time.time() - ttl_days * 86400,))
+    # Drop the least recently used entries above the size limit
+    if max_entries > 0:
+        connection.execute("""DELETE FROM resolutions WHERE title NOT IN (
+                                  SELECT title FROM resolutions ORDER BY last_used_at DESC LIMIT ?)""", (max_entries,))
+    connection.commit()
+
+def get_cached_resolution(connection, title, ttl_days):
+    row = connection.execute("SELECT url, strategy, resolved_at FROM resolutions WHERE title = ?",
+                             (normalize_title(title),)).fetchone()
+    if row is None:
+        return None
+
+    url, strategy, resolved_at = row
+    if ttl_days > 0 and resolved_at < time.time() - ttl_days * 86400:
+        forget_resolution(connection, title)
+        return None
+
+    connection.execute("UPDATE resolutions SET last_used_at = ? WHERE title = ?", (time.time(), normalize_title(title)))
+    connection.commit()
+    return url, strategy
+
+def store_resolution(connection, title, url, strategy):
+    now = time.time()
+    connection.execute("INSERT OR REPLACE INTO resolutions (title, url, strategy, resolved_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                       (normalize_title(title), url, strategy, now, now))
+    connection.commit()
+
+def get_stored_resolution(connection, title):
+    # (url, strategy) of the title without touching the cache entry, None if it was never resolved
+    return connection.execute("SELECT url, strategy FROM resolutions WHERE title = ?", (normalize_title(title),)).fetchone()
+
+def forget_resolution(connection, title):
+    connection.execute("DELETE FROM resolutions WHERE title = ?", (normalize_title(title),))
+    connection.commit()
+
+def get_processed_video_ids(connection, playlist_url):
+    rows = connection.execute("SELECT video_id FROM ledger WHERE playlist_url = ?", (playlist_url,)).fetchall()
+    return {row[0] for row in rows}
+
+def record_outcome(connection, playlist_url, video_id, title, outcome):
+    # Outcome is one of "favorited", "already-favorited" or "not-found"
+    connection.execute("INSERT OR REPLACE INTO ledger (playlist_url, video_id, title, outcome, processed_at) VALUES (?, ?, ?, ?, ?)",
+                       (playlist_url, video_id, title, outcome, time.time()))
+    connection.commit()
+
+class PlaylistBatch:
+    # Videos of all playlists in a run, deduplicated by title so each set is searched and favorited only once
+    def __init__(self, playlist_urls, checkpoint_file="", checkpoint_interval=30):
+        self.lock = Lock()
+        self.playlists = {playlist_url: {"title": "", "error": None, "complete": False, "videos": []} for playlist_url in playlist_urls}
+        self.pending = {}  # Normalized title -> videos waiting for its outcome
+        self.outcomes = {}  # Normalized title -> outcome of titles that are done
+        self.checkpoint_file = checkpoint_file
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_saved_at = time.time()
+        self.checkpoint_lock = Lock()
+        self.listeners = []  # Called with (title, outcome) when a title is done
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint, checkpoint_file="", checkpoint_interval=30):
+        # Restores the playlist snapshot of an interrupted run, titles without an outcome are processed again
+        batch = cls(list(checkpoint["playlists"]), checkpoint_file, checkpoint_interval)
+        for playlist_url, playlist in checkpoint["playlists"].items():
+            batch.playlists[playlist_url].update(title=playlist["title"], complete=playlist["complete"], videos=playlist["videos"])
+            for video in playlist["videos"]:
+                if video["outcome"] is not None:
+                    batch.outcomes[normalize_title(video["title"])] = video["outcome"]
+        for playlist in batch.playlists.values():
+            for video in playlist["videos"]:
+                if video["outcome"] is None:
+                    batch.pending.setdefault(normalize_title(video["title"]), []).append(video)
+        return batch
+
+    def get_pending_titles(self):
+        with self.lock:
+            return [videos[0]["title"] for videos in self.pending.values()]
+
+    def get_video_ids(self, playlist_url):
+        with self.lock:
+            return {video["video_id"] for video in self.playlists[playlist_url]["videos"]}
+
+    def is_playlist_complete(self, playlist_url):
+        with self.lock:
+            return self.playlists[playlist_url]["complete"]
+
+    def is_finished(self):
+        with self.lock:
+            return not self.pending and all(playlist["complete"] for playlist in self.playlists.values())
+
+    def set_playlist_title(self, playlist_url, title):
+        with self.lock:
+            self.playlists[playlist_url]["title"] = title
+
+    def set_playlist_complete(self, playlist_url):
+        with self.lock:
+            self.playlists[playlist_url]["complete"] = True
+
+    def set_playlist_error(self, playlist_url, error):
+        with self.lock:
+            self.playlists[playlist_url]["error"] = f"{type(error).__name__}: {error}"
+
+    def add_video(self, playlist_url, video_id, title):
+        # Returns (True, None) for new titles that have to be processed and (False, outcome) for duplicates,
+        # outcome is None while the first video with the same title is still being processed
+        key = normalize_title(title)
+        with self.lock:
+            video = {"playlist_url": playlist_url, "video_id": video_id, "title": title, "outcome": self.outcomes.get(key)}
+            self.playlists[playlist_url]["videos"].append(video)
+            if key in self.outcomes:
+                return False, self.outcomes[key]
+            if key in self.pending:
+                self.pending[key].append(video)
+                return False, None
+            self.pending[key] = [video]
+            return True, None
+
+    def finish_title(self, title, outcome):
+        # Stores the outcome for every video with this title and returns them as (playlist URL, video ID) pairs
+        key = normalize_title(title)
+        with self.lock:
+            self.outcomes[key] = outcome
+            videos = self.pending.pop(key, [])
+            for video in videos:
+                video["outcome"] = outcome
+        for listener in self.listeners:
+            listener(title, outcome)
+        return [(video["playlist_url"], video["video_id"]) for video in videos]
+
+    def get_results(self):
+        with self.lock:
+            return json.loads(json.dumps(self.playlists))
+
+    def save_checkpoint(self, force=False):
+        # Called after every title, but only writes every checkpoint_interval seconds unless forced
+        if not self.checkpoint_file or (not force and time.time() - self.checkpoint_saved_at < self.checkpoint_interval):
+            return
+        with self.checkpoint_lock:
+            self.checkpoint_saved_at = time.time()
+            write_json_atomically(self.checkpoint_file, {"saved_at": self.checkpoint_saved_at, "playlists": self.get_results()})
+
+def write_json_atomically(file_name, data):
+    # Write to a temporary file and swap it in, so a crash never leaves a half-written file behind
+    temporary_file_name = file_name + ".tmp"
+    with open(temporary_file_name, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary_file_name, file_name)
+
+def load_checkpoint(checkpoint_file):
+    if not checkpoint_file or not os.path.exists(checkpoint_file):
+        return None
+    try:
+        with open(checkpoint_file, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except Exception as e:
+        print_and_log(f"Failed to read the checkpoint {checkpoint_file}: {e}")
+        return None
+
+def describe_checkpoint(checkpoint):
+    videos = [video for playlist in checkpoint["playlists"].values() for video in playlist["videos"]]
+    done_video_count = sum(1 for video in videos if video["outcome"] is not None)
+    saved_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(checkpoint["saved_at"]))
+    return f"{done_video_count} of {len(videos)} videos processed, saved {saved_at}"
+
+def check_run_settings(params):
+    # Reports settings a run can't work with before anything is started, returns False in that case
+    try:
+        playlist_urls = get_playlist_urls(params)
+    except (OSError, UnicodeDecodeError) as e:
+        print_and_error(f"Failed to read the playlists file {params['youtube_playlists_file']}!\n\n{e}")
+        return False
+    if not playlist_urls:
+        print_and_error("No YouTube playlist is configured! Set a playlist URL or a playlists file.")
+        return False
+    if not params["chrome_path"]:
+        print_and_error("Chrome or Chromium wasn't found! Set the chrome.exe path.")
+        return False
+    return True
+
+def create_batch(params, resume=False):
+    # Resuming continues the interrupted run from its checkpoint if it was for the same playlists
+    playlist_urls = get_playlist_urls(params)
+    checkpoint = load_checkpoint(params["checkpoint_file"]) if resume else None
+    if checkpoint is not None and list(checkpoint["playlists"]) == playlist_urls:
+        print_and_log(f"Resuming the interrupted run ({describe_checkpoint(checkpoint)}).")
+        return PlaylistBatch.from_checkpoint(checkpoint, params["checkpoint_file"], params["checkpoint_interval_seconds"])
+    if resume:
+        print_and_log("No checkpoint of an interrupted run for these playlists, starting a new run.")
+    return PlaylistBatch(playlist_urls, params["checkpoint_file"], params["checkpoint_interval_seconds"])
+
+def finish_checkpoint(batch, stop_flag):
+    # Keep the checkpoint of stopped or crashed runs for resuming, remove it once everything is done
+    if not batch.checkpoint_file:
+        return
+    if batch.is_finished() and not stop_flag.is_set():
+        if os.path.exists(batch.checkpoint_file):
+            os.remove(batch.checkpoint_file)
+    else:
+        batch.save_checkpoint(force=True)
+        print_and_log(f"Progress saved to {batch.checkpoint_file}, the run can be resumed.")
+
+def get_playlist_urls(params):
+    # The playlist field may hold several URLs, more can be listed in configuration.json or in a text file (one per line)
+    playlist_urls = re.split(r"[\s,]+", params["youtube_playlist_url"]) + list(params["youtube_playlist_urls"])
+    if params["youtube_playlists_file"]:
+        with open(params["youtube_playlists_file"], "r", encoding="utf-8") as file:
+            playlist_urls += [line.split("#")[0] for line in file]
+    # Keep the order but drop empty entries and playlists listed twice
+    return list(dict.fromkeys(playlist_url.strip() for playlist_url in playlist_urls if playlist_url.strip()))
+
+def write_batch_results(batch, results_file):
+    results = batch.get_results()
+    for playlist_url, playlist in results.items():
+        outcomes = defaultdict(int)
+        for video in playlist["videos"]:
+            outcomes[video["outcome"] or "not-processed"] += 1
+        summary = ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())) or "no new videos"
+        if playlist["error"]:
+            summary = "failed to load: " + playlist["error"]
+        print_and_log(f"Playlist {playlist['title'] or playlist_url}: {summary}")
+
+    if results_file:
+        with open(results_file, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4, ensure_ascii=False)
+        print_and_log(f"Per-playlist results saved to {results_file}.")
+
+class ResultsWriter:
+    # Streams one record per processed title to a JSON lines file (or CSV if the name ends with ".csv"),
+    # appended in batches of "batch_size" records or every "flush_interval" seconds
+    fields = ["finished_at", "title", "outcome", "strategy", "url", "seconds"]
+
+    def __init__(self, results_file, batch_size=50, flush_interval=10):
+        self.results_file = results_file
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = Lock()
+        self.records = []
+        self.flushed_at = time.monotonic()
+
+    def write(self, title, outcome, strategy, url, seconds):
+        with self.lock:
+            self.records.append({"finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                                 "title": title,
+                                 "outcome": outcome or "failed",
+                                 "strategy": strategy or "",
+                                 "url": url or "",
+                                 "seconds": round(seconds, 3)})
+            if len(self.records) >= self.batch_size or time.monotonic() - self.flushed_at >= self.flush_interval:
+                self.flush_records()
+
+    def flush(self):
+        with self.lock:
+            self.flush_records()
+
+    def flush_records(self):
+        if self.records:
+            write_header = not os.path.exists(self.results_file) or os.path.getsize(self.results_file) == 0
+            with open(self.results_file, "a", encoding="utf-8", newline="") as file:
+                if self.results_file.lower().endswith(".csv"):
+                    writer = csv.DictWriter(file, self.fields)
+                    if write_header:
+                        writer.writeheader()
+                    writer.writerows(self.records)
+                else:
+                    file.writelines(json.dumps(record, ensure_ascii=False) + "\n" for record in self.records)
+            self.records.clear()
+        self.flushed_at = time.monotonic()
+
+def get_playlist_snapshot(connection, playlist_id):
+    # Returns (playlist title, listed at, {video ID: (position, title, error)}) or None if the playlist wasn't listed before
+    row = connection.execute("SELECT title, listed_at FROM playlist_snapshots WHERE playlist_id = ?", (playlist_id,)).fetchone()
+    if row is None:
+        return None
+    rows = connection.execute("SELECT video_id, position, title, error FROM playlist_snapshot_videos WHERE playlist_id = ?",
+                              (playlist_id,)).fetchall()
+    return row[0], row[1], {video_id: (position, title, error) for video_id, position, title, error in rows}
+
+def store_playlist_listing(connection, playlist_id, playlist_title, video_ids):
+    # Videos removed from the playlist are dropped, the titles of the remaining ones are kept
+    connection.execute("INSERT OR REPLACE INTO playlist_snapshots (playlist_id, title, listed_at) VALUES (?, ?, ?)",
+                       (playlist_id, playlist_title, time.time()))
+    listed_video_ids = set(video_ids)
+    removed_video_ids = [row[0] for row in connection.execute("SELECT video_id FROM playlist_snapshot_videos WHERE playlist_id = ?", (playlist_id,))
+                         if row[0] not in listed_video_ids]
+    connection.executemany("DELETE FROM playlist_snapshot_videos WHERE playlist_id = ? AND video_id = ?",
+                           [(playlist_id, video_id) for video_id in removed_video_ids])
+    connection.executemany("""INSERT INTO playlist_snapshot_videos (playlist_id, video_id, position) VALUES (?, ?, ?)
+                              ON CONFLICT (playlist_id, video_id) DO UPDATE SET position = excluded.position""",
+                           [(playlist_id, video_id, position) for position, video_id in enumerate(video_ids)])
+    connection.commit()
+
+def store_snapshot_title(connection, playlist_id, video_id, title, error):
+    connection.execute("UPDATE playlist_snapshot_videos SET title = ?, error = ?, fetched_at = ? WHERE playlist_id = ? AND video_id = ?",
+                       (title, error, time.time(), playlist_id, video_id))
+    connection.commit()
+
+def get_strategy_stats(connection, shape, prefix=""):
+    # HTTP attempts are stored as "http <strategy>" rows (prefix "http "), they cost a fraction of a browser search.
+    # The browser ordering only looks up the plain strategy names
+    rows = connection.execute("SELECT strategy, attempts, hits, seconds FROM strategy_stats WHERE shape = ?", (shape,)).fetchall()
+    return {strategy[len(prefix):]: (attempts, hits, seconds) for strategy, attempts, hits, seconds in rows if strategy.startswith(prefix)}
+
+def record_strategy_attempt(connection, shape, strategy, found, seconds):
+    connection.execute("""INSERT INTO strategy_stats (shape, strategy, attempts, hits, seconds) VALUES (?, ?, 1, ?, ?)
+                          ON CONFLICT (shape, strategy) DO UPDATE SET attempts = attempts + 1, hits = hits + excluded.hits,
+                                                                      seconds = seconds + excluded.seconds""",
+                       (shape, strategy, int(found), seconds))
+    connection.commit()
+
+@timed("youtube_title_fetch")
+def fetch_video_title(video_url, retries):
+    for attempt in range(retries + 1):
         try:
-            # Try to access the video's title (this will fail if the video is unavailable)
-            title = video.title
-            available_videos.append(title)
-            video_count = video_count + 1
+            return YouTube(video_url).title
+        except VideoUnavailable:
+            # Private, removed or region-locked videos won't come back on retry
+            raise
         except Exception as e:
-            # If a video is unavailable, it will throw a KeyError
-            print_and_log("A video is unavailable and will be skipped: " + video.title)
-            print_and_log(e)
+            if attempt == retries:
+                raise
+            # Exponential backoff with jitter before retrying network errors
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+
+def iterate_video_titles(video_urls, concurrency, retries, stop_flag):
+    # Resolves titles on a bounded thread pool but yields (video URL, title, error) in playlist order
+    video_urls = iter(video_urls)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        try:
+            for video_url in islice(video_urls, concurrency * 2):
+                pending.append((video_url, executor.submit(fetch_video_title, video_url, retries)))
+
+            while pending and not stop_flag.is_set():
+                video_url, future = pending.popleft()
+                try:
+                    yield video_url, future.result(), None
+                except Exception as e:
+                    yield video_url, None, e
+
+                # Keep the pool busy with the next video in the playlist
+                for next_video_url in islice(video_urls, 1):
+                    pending.append((next_video_url, executor.submit(fetch_video_title, next_video_url, retries)))
+        finally:
+            # Don't resolve titles that won't be used anymore (stop flag or record limit)
+            for video_url, future in pending:
+                future.cancel()
+
+def iterate_snapshot_titles(video_urls, known_titles, concurrency, retries, stop_flag):
+    # Like iterate_video_titles, but titles known from the playlist snapshot are used without asking YouTube.
+    # Yields (video URL, title, error, fetched) in playlist order
+    fetched_titles = iterate_video_titles([video_url for video_url in video_urls if video_url not in known_titles], concurrency, retries, stop_flag)
+    try:
+        for video_url in video_urls:
+            if stop_flag.is_set():
+                return
+            if video_url in known_titles:
+                title, error = known_titles[video_url]
+                yield video_url, title, error, False
+            else:
+                fetched_video = next(fetched_titles, None)
+                if fetched_video is None:
+                    return
+                yield (*fetched_video, True)
+    finally:
+        fetched_titles.close()
+
+def put_video(video_queue, video, stop_flag):
+    # Blocks while the queue is full (backpressure from the browser workers) but gives up once the automation is stopped
+    while not stop_flag.is_set():
+        try:
+            video_queue.put(video, timeout=0.1)
+            return True
+        except queue.Full:
             continue
+    return False
+
+def get_video(video_queue, stop_flag, handed_back_videos=None):
+    # Returns the next title, or None at the end of the playlist or once the automation is stopped.
+    # Titles handed back by workers that failed (handed_back_videos) come first, they can't get stuck behind the end marker
+    while not stop_flag.is_set():
+        if handed_back_videos:
+            try:
+                return handed_back_videos.popleft()
+            except IndexError:
+                pass
+        try:
+            video = video_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if video is None:
+            # Leave the end marker in the queue for the other workers
+            video_queue.put(None)
+            if handed_back_videos:
+                continue
+        return video
+    return None
+
+# Step 1: Get video titles from the YouTube playlists and stream them to the browser workers through video_queue
+def get_available_video_titles(playlist_urls, playlist_record_limit, video_queue, stop_flag, batch, cache_database="hoer_live_cache.db",
+                               full_resync=False, fetch_concurrency=8, fetch_retries=3):
+    try:
+        if len(playlist_urls) > 1:
+            setup_logging('playlist batch log.txt')
+            print_and_log(f"Processing {len(playlist_urls)} playlists in one batch, titles found in several playlists are processed once.")
+
+        # Titles of a resumed run that weren't processed yet come first
+        for title in batch.get_pending_titles():
+            if not put_video(video_queue, title, stop_flag):
+                break
+
+        available_video_count = 0
+        failed_playlist_count = 0
+        for playlist_url in playlist_urls:
+            if stop_flag.is_set():
+                break
+            if batch.is_playlist_complete(playlist_url):
+                continue
+            try:
+                available_video_count += stream_available_video_titles(playlist_url, playlist_record_limit, video_queue, stop_flag, batch,
+                                                                       cache_database, full_resync, fetch_concurrency, fetch_retries,
+                                                                       len(playlist_urls) == 1)
+            except Exception as e:
+                # A single playlist fails the run, in a batch the other playlists are still processed
+                if len(playlist_urls) == 1:
+                    raise
+                print_and_log(f"Failed to load YouTube playlist {playlist_url}. Error: {e}")
+                batch.set_playlist_error(playlist_url, e)
+                failed_playlist_count += 1
+
+        if playlist_urls and failed_playlist_count == len(playlist_urls):
+            raise Exception("none of the playlists could be loaded")
+        return available_video_count
+    finally:
+        # Mark the end of the playlists, also when they failed to load
+        put_video(video_queue, None, stop_flag)
+
+@timed("playlist_fetch")
+def stream_available_video_titles(playlist_url, playlist_record_limit, video_queue, stop_flag, batch, cache_database, full_resync,
+                                  fetch_concurrency, fetch_retries, playlist_log=True):
+    import_pytube()
+
+    # Sets the default client type for pytube (fixes errors when reading some video titles)
+    _default_clients["ANDROID_MOBILE"] = _default_clients["WEB"]
+    
+    playlist_id = extract.playlist_id(playlist_url)
+    database = open_cache_database(cache_database)
+    try:
+        snapshot = get_playlist_snapshot(database, playlist_id)
+
+        # Only the listing is fetched from YouTube, titles of videos in the last snapshot are reused.
+        # When YouTube can't be reached, the last snapshot is used as it is
+        try:
+            with timed_step("playlist_listing"):
+                playlist = Playlist(playlist_url)
+                video_urls = list(playlist.video_urls)
+                playlist_title = playlist.title
+            store_playlist_listing(database, playlist_id, playlist_title, [extract.video_id(video_url) for video_url in video_urls])
+        except Exception as e:
+            if snapshot is None:
+                raise
+            playlist_title, listed_at, snapshot_videos = snapshot
+            video_urls = [f"https://www.youtube.com/watch?v={video_id}" for video_id in sorted(snapshot_videos, key=lambda video_id: snapshot_videos[video_id][0])]
+            print_and_log(f"Couldn't list the playlist on YouTube ({e}), using the snapshot from {time.strftime('%Y-%m-%d %H:%M', time.localtime(listed_at))}.")
+
+        # Batches log to a single file
+        if playlist_log:
+            setup_logging(playlist_title + ' playlist log.txt')
+        batch.set_playlist_title(playlist_url, playlist_title)
+
+        print_and_log(f"Fetching video titles from YouTube playlist {playlist_title}...")
+
+        # Videos processed on previous runs are skipped unless a full resync is requested, which also fetches every title again
+        if full_resync:
+            processed_video_ids = set()
+            known_titles = {}
+        else:
+            processed_video_ids = get_processed_video_ids(database, playlist_url)
+            if processed_video_ids:
+                print_and_log(f"Skipping {len(processed_video_ids)} videos processed on previous runs.")
+            snapshot_videos = snapshot[2] if snapshot is not None else {}
+            known_titles = {}
+            for video_url in video_urls:
+                snapshot_video = snapshot_videos.get(extract.video_id(video_url))
+                if snapshot_video is not None and any(snapshot_video[1:]):
+                    known_titles[video_url] = snapshot_video[1:]
+    finally:
+        database.close()
+
+    # Videos in the checkpoint of a resumed run are already in the batch
+    resumed_video_ids = batch.get_video_ids(playlist_url)
+
+    skipped_video_ids = processed_video_ids | resumed_video_ids
+    positions = {}
+    for position, video_url in enumerate(video_urls):
+        if extract.video_id(video_url) not in skipped_video_ids:
+            positions[video_url] = position
+    
+    # Counters for the summary, new titles go straight to the queue
+    available_video_count = len(resumed_video_ids)
+    duplicate_video_count = 0
+    snapshot_title_count = 0
+    unavailable_videos = []
+
+    # Fetched titles go to the snapshot, duplicates of titles that are already done are recorded in the ledger right away
+    database = open_cache_database(cache_database)
+    try:
+        for video_url, title, error, fetched in iterate_snapshot_titles(list(positions), known_titles, fetch_concurrency, fetch_retries, stop_flag):
+            if fetched:
+                # Only videos YouTube reports as unavailable are remembered as such, other failures (timeouts, pytube
+                # breaking) stay unknown so the next run fetches them again
+                if error is None or isinstance(error, VideoUnavailable):
+                    store_snapshot_title(database, playlist_id, extract.video_id(video_url), title,
+                                         None if error is None else f"{type(error).__name__}: {error}")
+            else:
+                snapshot_title_count = snapshot_title_count + 1
+
+            if error is not None:
+                unavailable_video = {"position": positions[video_url],
+                                     "video_id": extract.video_id(video_url),
+                                     "url": video_url,
+                                     "error": error if isinstance(error, str) else f"{type(error).__name__}: {error}"}
+                unavailable_videos.append(unavailable_video)
+                print_and_log("A video is unavailable and will be skipped: " + json.dumps(unavailable_video))
+                continue
+
+            # Titles already seen in this batch share the outcome of the first video instead of being searched again
+            is_new_title, outcome = batch.add_video(playlist_url, extract.video_id(video_url), title)
+            if is_new_title:
+                if not put_video(video_queue, title, stop_flag):
+                    break
+            else:
+                duplicate_video_count = duplicate_video_count + 1
+                if outcome is not None:
+                    record_outcome(database, playlist_url, extract.video_id(video_url), title, outcome)
+            available_video_count = available_video_count + 1
+
+            if playlist_record_limit > 0 and available_video_count >= playlist_record_limit:
+                break
+        else:
+            if not stop_flag.is_set():
+                batch.set_playlist_complete(playlist_url)
+    finally:
+        database.close()
+
+    if playlist_record_limit > 0 and available_video_count >= playlist_record_limit:
+        batch.set_playlist_complete(playlist_url)
+    batch.save_checkpoint(force=True)
     
-    print_and_log(f"Fetched {len(available_videos)} available video titles.")
-    return available_videos
+    print_and_log(f"Fetched {available_video_count} available video titles ({snapshot_title_count} from the snapshot, "
+                  f"{len(unavailable_videos)} unavailable, {duplicate_video_count} already in the batch).")
+    return available_video_count
 
+@timed("click_close_popup")
 def click_close_popup(driver):
     try:
         popup_close_button = driver.find_element(By.XPATH, '//span[@class="popup__close"]')
         popup_close_button.click()
         print_and_log("Closed popup.")
-        time.sleep(1)  # Wait for any transitions or actions to complete
+        # Wait for the popup to disappear
+        wait_until(driver, EC.invisibility_of_element(popup_close_button), "click_close_popup", required=False)
     except Exception as e:
         print_and_log("Popup already closed.")
 
+@timed("click_consent")
 def click_consent(driver):
     try:
         consent_button = driver.find_element(By.XPATH, '//button[@class="cookie-consent__accept button-white"]')
         consent_button.click()
         print_and_log("Accepted cookies.")
-        time.sleep(1)  # Wait for any transitions or actions to complete
+        # Wait for the cookie banner to disappear
+        wait_until(driver, EC.invisibility_of_element(consent_button), "click_consent", required=False)
     except Exception as e:
         print_and_log("Cookies already accepted.")
 
@@ -192,6 +1099,38 @@ def check_if_logged_in(driver, target_website_url):
         except Exception as e:
             return False
 
+def get_session_cookies(driver, website_url):
+    # Cookies stored in the Chrome profile for the website, also while the tab shows another page
+    try:
+        return driver.execute_cdp_cmd("Network.getCookies", {"urls": [website_url]})["cookies"]
+    except Exception as e:
+        return driver.get_cookies()
+
+def has_login_cookie(cookies):
+    # WordPress keeps the login in a "wordpress_logged_in_<hash>" cookie (DevTools reports session cookies with expires -1)
+    for cookie in cookies:
+        expires = cookie.get("expires", cookie.get("expiry", -1))
+        if cookie["name"].startswith("wordpress_logged_in_") and (expires <= 0 or expires > time.time()):
+            return True
+    return False
+
+@timed("session_check")
+def check_session(driver, target_website_url):
+    # Cheap alternative to the login UI: one request with the profile's cookies, logged in pages link to the account page
+    try:
+        cookies = get_session_cookies(driver, target_website_url)
+        if not has_login_cookie(cookies):
+            return False
+        client = HoerLiveHttpClient(target_website_url, cookies, driver.execute_script("return navigator.userAgent"), wait_timeouts["page_load"])
+        for link in parse_links(client.get_page(target_website_url)):
+            if link["href"].endswith("/my-account/edit-account/") or link["text"].strip() == "Logout":
+                return True
+        return False
+    except Exception as e:
+        print_and_log(f"Couldn't check the saved session: {e}")
+        return False
+
+@timed("login")
 def login(username, password, driver, target_website_url, stop_flag):
     try:
         if stop_flag.is_set():
@@ -208,12 +1147,18 @@ def login(username, password, driver, target_website_url, stop_flag):
         if stop_flag.is_set():
             return
 
+        # The popup and the cookie banner would cover the search, also with a saved session
         click_close_popup(driver)
         click_consent(driver)
 
         if stop_flag.is_set():
             return
 
+        # Skip the login UI while the session saved in the Chrome profile is still valid
+        if check_session(driver, target_website_url):
+            print_and_log("Already logged in (saved session).")
+            return True
+
         print_and_log("Attempting to log in.")
 
         login_object = driver.find_element(By.XPATH, '//div[@class="hamburger hamburger--slider js-hamburger"]')
@@ -221,7 +1166,12 @@ def login(username, password, driver, target_website_url, stop_flag):
             print_and_log("Logging in through the hamburger element.")
             login_object = driver.find_element(By.XPATH, '//div[@class="hamburger hamburger--slider js-hamburger"]')
             login_object.click()
-            time.sleep(1)
+            # Wait for the menu to show either the logout link or the member icon
+            wait_until(driver,
+                       EC.any_of(EC.presence_of_element_located((By.XPATH, '//a[text()="Logout"]')),
+                                 EC.element_to_be_clickable((By.XPATH, '//span[@class="icon icon_member open-popup"]'))),
+                       "login",
+                       required=False)
             try:
                 login_object = driver.find_element(By.XPATH, '//a[text()="Logout"]')
                 print_and_log("Already logged in.")
@@ -229,7 +1179,6 @@ def login(username, password, driver, target_website_url, stop_flag):
             except Exception as e:
                 login_object = driver.find_element(By.XPATH, '//span[@class="icon icon_member open-popup"]')
                 login_object.click()
-                time.sleep(1)
         else:
             print_and_log("Logging in through the icon element.")
             try:
@@ -239,12 +1188,14 @@ def login(username, password, driver, target_website_url, stop_flag):
             except Exception as e:
                 login_object = driver.find_element(By.XPATH, '//span[@class="user-letter__text"]')
                 login_object.click()
-                time.sleep(1)
 
         if stop_flag.is_set():
             return
 
-        login_object = driver.find_element(By.XPATH, '//button[@class="magic-form__next button button_green"]')
+        # Wait for the login popup to open
+        login_object = wait_until(driver,
+                                  EC.element_to_be_clickable((By.XPATH, '//button[@class="magic-form__next button button_green"]')),
+                                  "login")
         login_object.click()
         login_object = driver.find_element(By.ID, "username")
         login_object.click()
@@ -254,8 +1205,9 @@ def login(username, password, driver, target_website_url, stop_flag):
         login_object.send_keys(password)
         login_object = driver.find_element(By.XPATH, '//button[@class="woocommerce-button button woocommerce-form-login__submit"]')
         login_object.click()
-        time.sleep(1)
-        if not check_if_logged_in(driver, target_website_url):
+        # Wait for the login form to be submitted
+        wait_for_navigation(driver, login_object, "login")
+        if not (check_session(driver, target_website_url) or check_if_logged_in(driver, target_website_url)):
             print_and_error("Failed to togin to " + target_website_url + "\n\nCheck credentials!")
             return False
         return True
@@ -263,6 +1215,7 @@ def login(username, password, driver, target_website_url, stop_flag):
         print_and_log(f"Failed to connect to the browser or encountered an error: {e}")
         return False
 
+@timed("toggle_search")
 def toggle_search(driver, title):
     print_and_log(f"Searching for: {title}")
     close_button = driver.find_element(By.XPATH, "//div[@class='search__close toggle-search']")
@@ -275,154 +1228,1563 @@ def toggle_search(driver, title):
     search_bar.send_keys(Keys.CONTROL, 'a')
     search_bar.send_keys(Keys.BACKSPACE)
     search_bar.send_keys(title)
-    search_bar.send_keys(Keys.RETURN)
-    time.sleep(2)  # Wait for the search results to load
-
+    page = driver.find_element(By.TAG_NAME, "html")
+    with measure_page_load():
+        search_bar.send_keys(Keys.RETURN)
+        # Wait for the search results to load (either the page is replaced or results show up)
+        wait_until(driver,
+                   lambda d: element_is_stale(page) or d.find_elements(By.XPATH, "//a[@class='result no-ajax' or @class='result']"),
+                   "toggle_search",
+                   required=False)
+        wait_for_page_ready(driver, "toggle_search")
+
+@timed("click_result_item")
 def click_result_item(driver):
     # Wait until the element is clickable
-    result = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.XPATH, "//a[@class='result no-ajax']")))
+    result = wait_until(driver, EC.element_to_be_clickable((By.XPATH, "//a[@class='result no-ajax']")), "click_result_item")
     result.click()
-    time.sleep(1)
+    wait_for_navigation(driver, result, "click_result_item")
 
+@timed("click_artist_result_item")
 def click_artist_result_item(driver):
     # Wait until the element is clickable
-    result = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.XPATH, "//a[@class='result']")))
+    result = wait_until(driver, EC.element_to_be_clickable((By.XPATH, "//a[@class='result']")), "click_artist_result_item")
     result.click()
-    time.sleep(1)
+    wait_for_navigation(driver, result, "click_artist_result_item")
 
+@timed("click_label_result_item")
 def click_label_result_item(driver, split_artist_title_part):
     print_and_log(f"Searching list for: {split_artist_title_part}")
     # Wait until the element is clickable
-    result = WebDriverWait(driver, 3).until(EC.element_to_be_clickable((By.XPATH, "//a[@class='result no-ajax']//span[contains(@class, 'result__title') and contains(text(), '" + split_artist_title_part + "')]")))
+    result = wait_until(driver,
+                        EC.element_to_be_clickable((By.XPATH, "//a[@class='result no-ajax']//span[contains(@class, 'result__title') and contains(text(), '" + split_artist_title_part + "')]")),
+                        "click_label_result_item")
     result.click()
-    time.sleep(1)
+    wait_for_navigation(driver, result, "click_label_result_item")
 
+@timed("click_favorite_icon")
 def click_favorite_icon(driver, title):
     try:
         favorite_icon = driver.find_element(By.XPATH, '//div[@class="main-video__icons"]//a[@class="icon icon_heart icon_favorite no-ajax"]')
+        original_class = favorite_icon.get_attribute("class")
         favorite_icon.click()
         print_and_log(f"Added to favorites: {title}")
+        # Wait for the heart icon to switch state
+        wait_until(driver, favorite_icon_changed(favorite_icon, original_class), "click_favorite_icon", required=False)
+        return "favorited"
     except Exception as e:
         print_and_log(f"Already favorited: {title}")
+        return "already-favorited"
 
+@timed("click_artist_favorite_icon")
 def click_artist_favorite_icon(driver, title):
     try:
         favorite_icon = driver.find_element(By.XPATH, '//div[@class="show-card__info"]//a[@class="icon icon_heart icon_favorite no-ajax"]')
+        original_class = favorite_icon.get_attribute("class")
         favorite_icon.click()
         print_and_log(f"Added to favorites: {title}")
-        time.sleep(1)  # Wait for any transitions or actions to complete
+        # Wait for the heart icon to switch state
+        wait_until(driver, favorite_icon_changed(favorite_icon, original_class), "click_artist_favorite_icon", required=False)
+        return "favorited"
     except Exception as e:
         print_and_log(f"Already favorited: {title}")
+        return "already-favorited"
 
-# Step 2: Automate browser interaction with Selenium
-def automate_website_interaction(chrome_path, available_videos, website_url, username, password, stop_flag):
-    if stop_flag.is_set():
-        return
+def check_favorite_icon_present(driver, strategy):
+    # Raises if the page doesn't show a favorite icon (favorited or not) where the strategy expects one
+    if strategy == "artist_name":
+        driver.find_element(By.XPATH, '//div[@class="show-card__info"]//a[contains(@class, "icon_favorite")]')
+    else:
+        driver.find_element(By.XPATH, '//div[@class="main-video__icons"]//a[contains(@class, "icon_favorite")]')
+
+def click_cached_result(driver, title, url, strategy):
+    print_and_log(f"Opening cached page for: {title}")
+    load_website(driver, url)
+    check_favorite_icon_present(driver, strategy)
+    if strategy == "artist_name":
+        return click_artist_favorite_icon(driver, title)
+    else:
+        return click_favorite_icon(driver, title)
+
+# Search strategies, tried from the most to the least promising for the shape of the title (see order_search_attempts)
+class SearchStrategy:
+    def __init__(self, name, description, result_type, build_query):
+        self.name = name
+        self.description = description
+        self.result_type = result_type  # "set", "artist" or "label"
+        self.build_query = build_query  # Returns (query, label prefix) for a parsed title, or None if the strategy doesn't apply
+
+search_strategies = []
+
+def register_search_strategy(name, description, result_type):
+    def decorator(build_query):
+        search_strategies.append(SearchStrategy(name, description, result_type, build_query))
+        return build_query
+    return decorator
+
+@register_search_strategy("full_title", "the full title", "set")
+def full_title_query(parsed):
+    return parsed.text, None
+
+@register_search_strategy("first_and_last_parts", "first and last parts of the title", "set")
+def first_and_last_parts_query(parsed):
+    if parsed.artist and parsed.date:
+        return " - ".join(part for part in (parsed.label, parsed.artist) if part) + " " + parsed.date, None
+    return None
+
+@register_search_strategy("second_half", "the second half of the title", "set")
+def second_half_query(parsed):
+    if not parsed.artist and len(parsed.dash_parts) > 1:
+        return parsed.dash_parts[1], None
+    return None
+
+@register_search_strategy("artist_name", "just the artist name", "artist")
+def artist_name_query(parsed):
+    # "A b2b B" has no artist page of its own, A's page is searched
+    if parsed.artists and not parsed.label:
+        return parsed.artists[0], None
+    return None
+
+@register_search_strategy("partner_name", "just the b2b partner's name", "artist")
+def partner_name_query(parsed):
+    if parsed.partners and not parsed.label:
+        return parsed.partners[0], None
+    return None
+
+@register_search_strategy("label_name", "just the label name", "label")
+def label_name_query(parsed):
+    # The label result is picked by the first letters of the artist name
+    if parsed.label and parsed.artist:
+        return parsed.label, parsed.artist.split()[0][0:3]
+    return None
+
+def get_title_shape(title):
+    # Titles of the same shape tend to be found by the same strategy, e.g. "Label - Artist | HÖR - Date" by the label
+    parsed = parse_title(title)
+    if parsed.label:
+        return "dash_before_pipe"
+    if parsed.artist:
+        return "pipe_before_dash" if parsed.date else "pipe"
+    if len(parsed.dash_parts) > 1:
+        return "dash"
+    return "plain"
+
+def order_search_attempts(attempts, stats):
+    # Lowest expected cost per hit first: average seconds per attempt divided by the hit rate. The counts are smoothed,
+    # so strategies without history keep the registration order until enough attempts are recorded
+    def expected_cost(attempt):
+        attempt_count, hits, seconds = stats.get(attempt[0], (0, 0, 0.0))
+        hit_rate = (hits + 1) / (attempt_count + 2)
+        average_seconds = (seconds + 5.0) / (attempt_count + 1)
+        return average_seconds / hit_rate
+    return sorted(attempts, key=expected_cost)
+
+def get_search_attempts(title, stats=None):
+    # Search queries to try for a title, in order, as (strategy, description, query, result type, label prefix)
+    parsed = parse_title(title)
+    attempts = []
+    for strategy in search_strategies:
+        query = strategy.build_query(parsed)
+        if query is not None:
+            attempts.append((strategy.name, strategy.description, query[0], strategy.result_type, query[1]))
+    if stats:
+        attempts = order_search_attempts(attempts, stats)
+    return attempts
+
+def click_search_result(driver, title, result_type, label_prefix):
+    # Returns the outcome and the page of the result, read before the heart icon (a link too) is clicked
+    if result_type == "artist":
+        click_artist_result_item(driver)
+        page_url = driver.current_url
+        return click_artist_favorite_icon(driver, title), page_url
+    if result_type == "label":
+        click_label_result_item(driver, label_prefix)
+    else:
+        click_result_item(driver)
+    page_url = driver.current_url
+    return click_favorite_icon(driver, title), page_url
+
+def get_search_result_xpath(result_type, label_prefix):
+    # The result the click_*_result_item functions click for the result type
+    if result_type == "artist":
+        return "//a[@class='result']"
+    if result_type == "label":
+        return "//a[@class='result no-ajax']//span[contains(@class, 'result__title') and contains(text(), '" + label_prefix + "')]"
+    return "//a[@class='result no-ajax']"
+
+class SearchTabs:
+    # Tabs of one logged-in browser that load the search results of several attempts at the same time (speculative search)
+    def __init__(self, session, count):
+        self.session = session
+        self.count = count
+        self.handles = []
+
+    def open(self):
+        # The tabs are kept for the next titles, closed or crashed tabs are replaced
+        driver = self.session.driver
+        open_handles = driver.window_handles
+        self.handles = [handle for handle in self.handles if handle in open_handles]
+        if not self.handles:
+            self.handles.append(driver.current_window_handle)
+        while len(self.handles) < self.count:
+            driver.switch_to.new_window("tab")
+            self.session.block_urls()
+            self.handles.append(driver.current_window_handle)
+
+    def start(self, urls):
+        self.open()
+        driver = self.session.driver
+        for handle, url in zip(self.handles, urls):
+            driver.switch_to.window(handle)
+            # Navigating from a script returns right away so all tabs load at once, the flag tells the old page from the new one
+            driver.execute_script("window.hoerLiveLeaving = true; window.location.href = arguments[0];", url)
+
+    def has_result(self, index, xpath):
+        driver = self.session.driver
+        driver.switch_to.window(self.handles[index])
+        with measure_page_load():
+            wait_until(driver,
+                       lambda d: d.execute_script("return !window.hoerLiveLeaving && document.readyState") in wait_timeouts["ready_states"],
+                       "speculative_search",
+                       wait_timeouts["page_load"])
+        return bool(driver.find_elements(By.XPATH, xpath))
+
+    def get_load_seconds(self, index):
+        # How long the tab's own page took to load (Navigation Timing), the tabs load side by side so a shared clock would also count the tabs checked before it
+        driver = self.session.driver
+        driver.switch_to.window(self.handles[index])
+        load_ms = driver.execute_script("var entry = performance.getEntriesByType('navigation')[0]; return entry ? entry.domInteractive : null;")
+        return load_ms / 1000 if load_ms else None
+
+    def cancel(self, indexes):
+        # Stops the searches that are no longer needed
+        driver = self.session.driver
+        for index in indexes:
+            try:
+                driver.switch_to.window(self.handles[index])
+                driver.execute_script("window.stop();")
+            except Exception:
+                pass
+
+def get_tab_attempt_seconds(started_at, load_seconds, ready_at):
+    # Without the tab's load time (the page never loaded) the attempt took as long as the whole wait
+    if load_seconds is None:
+        return time.perf_counter() - started_at
+    return load_seconds + time.perf_counter() - ready_at
+
+def search_in_tabs(search_tabs, database, website_url, title, shape, attempts, stop_flag):
+    # All attempts of a group are searched at the same time, the most promising attempt with a result wins
+    driver = search_tabs.session.driver
+    for group_start in range(0, len(attempts), search_tabs.count):
+        group = attempts[group_start:group_start + search_tabs.count]
+        if stop_flag.is_set():
+            return None
 
-    run_chrome_if_not_running(chrome_path)
+        started_at = time.perf_counter()
+        print_and_log(f"Searching {len(group)} ways at once for: {title}")
+        search_tabs.start([get_search_url(website_url, query) for _, _, query, _, _ in group])
+        for index, (strategy, description, query, result_type, label_prefix) in enumerate(group):
+            if stop_flag.is_set():
+                return None
+            # Each attempt is timed by its tab's own load plus the checking and clicking after it
+            load_seconds = None
+            ready_at = time.perf_counter()
+            try:
+                with timed_step("attempt " + strategy, speculative=True):
+                    found = search_tabs.has_result(index, get_search_result_xpath(result_type, label_prefix))
+                    load_seconds = search_tabs.get_load_seconds(index)
+                    ready_at = time.perf_counter()
+                    if not found:
+                        raise LookupError(f"no result for {query}")
+                    outcome, resolved_url = click_search_result(driver, title, result_type, label_prefix)
+            except Exception as e:
+                if classify_failure(e) == "stale":
+                    search_tabs.cancel(range(index + 1, len(group)))
+                    raise
+                print_and_log(f"Couldn't find: {query}")
+                record_strategy_result(strategy, False)
+                record_strategy_attempt(database, shape, strategy, False, get_tab_attempt_seconds(started_at, load_seconds, ready_at))
+                continue
+            search_tabs.cancel(range(index + 1, len(group)))
+            driver.switch_to.window(search_tabs.handles[index])
+            record_strategy_result(strategy, True)
+            record_strategy_attempt(database, shape, strategy, True, get_tab_attempt_seconds(started_at, load_seconds, ready_at))
+            store_resolution(database, title, resolved_url, strategy)
+            return outcome
+
+    print_and_log(f"Error processing {title}: no search attempt found it")
+    return "not-found"
+
+# Failures worth retrying: the site was slow, throttled us or re-rendered the page while we used it
+transient_failures = {"timeout", "stale", "rate-limited", "server-error"}
+
+def classify_failure(error):
+    if isinstance(error, HoerLiveHttpError):
+        if error.status == 429:
+            return "rate-limited"
+        if error.status >= 500:
+            return "server-error"
+        if error.status == 404:
+            return "not-found"
+        return "http-error"
+    if StaleElementReferenceException is not None and isinstance(error, StaleElementReferenceException):
+        return "stale"
+    # Selenium, urllib3 and socket timeouts don't share a base class
+    if any(error_class.__name__ in ("TimeoutException", "TimeoutError", "ReadTimeoutError", "ConnectTimeoutError") for error_class in type(error).__mro__):
+        return "timeout"
+    if type(error).__name__ == "MaxRetryError" and error.reason is not None:
+        return classify_failure(error.reason)
+    return "error"
+
+def get_retry_delay(error, attempt):
+    # Exponential backoff with jitter, at least as long as the server asked for
+    delay = 1.0 * 2 ** attempt + random.uniform(0, 1.0)
+    return max(delay, getattr(error, "retry_after", None) or 0)
+
+def retry_transient_failures(function, title, stop_flag, retries):
+    for attempt in range(retries + 1):
+        try:
+            return function()
+        except Exception as e:
+            failure = classify_failure(e)
+            record_failure(failure)
+            if failure not in transient_failures or attempt == retries or stop_flag.is_set():
+                raise
+            delay = get_retry_delay(e, attempt)
+            print_and_log(f"Retrying {title} in {delay:.1f} seconds after a {failure} failure ({type(e).__name__})...")
+            stop_flag.wait(delay)
+
+class AdaptiveRate:
+    # AIMD pacing of the requests of one session: the rate grows additively while responses are fast and healthy,
+    # and is cut in half when the site slows down, throttles or fails
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=10.0, target_latency=1.5, increase=0.1, decrease=0.5):
+        self.lock = Lock()
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.target_latency = target_latency
+        self.increase = increase
+        self.decrease = decrease
+        self.next_request_at = time.monotonic()
+
+    def wait(self, stop_flag=None):
+        # Reserve the next request slot, then sleep until it comes up
+        with self.lock:
+            now = time.monotonic()
+            request_at = max(now, self.next_request_at)
+            self.next_request_at = request_at + 1 / self.rate
+        if request_at > now:
+            if stop_flag is not None:
+                stop_flag.wait(request_at - now)
+            else:
+                time.sleep(request_at - now)
+
+    def record(self, latency=None, failure=None):
+        with self.lock:
+            if failure in transient_failures or (latency is not None and latency > self.target_latency):
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+            elif failure is None:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+def run_paced(rate, function, stop_flag):
+    # Paces a browser title like one request, its slowest page load counts as the latency (the rate's target is a page load time)
+    rate.wait(stop_flag)
+    page_loads.slowest = 0.0
+    try:
+        result = function()
+    except Exception as e:
+        rate.record(failure=classify_failure(e))
+        raise
+    rate.record(latency=page_loads.slowest)
+    return result
+
+# Find a single video title on the website and add it to favorites
+@timed("title")
+def process_title(driver, database, website_url, title, resolution_cache_ttl_days, stop_flag, catalog=None, catalog_match_threshold=0.8,
+                  direct_search=False, search_tabs=None):
+    # Returns the outcome ("favorited", "already-favorited" or "not-found"), or None if the automation was stopped.
+    # Failures are raised so the caller can retry the transient ones
+    cached_resolution = get_cached_resolution(database, title, resolution_cache_ttl_days)
+    if cached_resolution is not None:
+        try:
+            with timed_step("attempt cached"):
+                outcome = click_cached_result(driver, title, *cached_resolution)
+            record_strategy_result("cached", True)
+            return outcome
+        except Exception as e:
+            if classify_failure(e) == "stale":
+                raise
+            print_and_log(f"Cached page is no longer valid for: {title}")
+            record_strategy_result("cached", False)
+            forget_resolution(database, title)
+
+    # A confident catalog match needs a single page load instead of up to three searches
+    catalog_url = match_catalog_title(catalog, title, catalog_match_threshold)
+    if catalog_url is not None:
+        try:
+            with timed_step("attempt catalog_match"):
+                outcome = click_cached_result(driver, title, catalog_url, "catalog_match")
+            record_strategy_result("catalog_match", True)
+            store_resolution(database, title, catalog_url, "catalog_match")
+            return outcome
+        except Exception as e:
+            if classify_failure(e) == "stale":
+                raise
+            print_and_log(f"Catalog page is no longer valid for: {title}")
+            record_strategy_result("catalog_match", False)
+
+    # Step 2.1: Search with the strategy that worked best for titles of this shape, then fall back to the others
+    shape = get_title_shape(title)
+    if search_tabs is not None:
+        return search_in_tabs(search_tabs, database, website_url, title, shape, get_search_attempts(title, get_strategy_stats(database, shape)),
+                              stop_flag)
+
+    if not direct_search:
+        load_website(driver, website_url)
 
-    print_and_log("Starting browser automation...")
+    for attempt_number, (strategy, description, query, result_type, label_prefix) in enumerate(get_search_attempts(title, get_strategy_stats(database, shape))):
+        if stop_flag.is_set():
+            return None
 
-    # Connect to an existing Chrome session
-    chrome_options = Options()
-    chrome_options.add_experimental_option("debuggerAddress", "127.0.0.1:9222")  # Ensure this matches the port you used
+        if attempt_number > 0:
+            print_and_log(f"Retrying attempt {attempt_number}: using {description}...")
 
+        started_at = time.perf_counter()
+        try:
+            with timed_step("attempt " + strategy):
+                if direct_search:
+                    open_search_results(driver, website_url, query)
+                else:
+                    toggle_search(driver, query)
+                outcome, resolved_url = click_search_result(driver, title, result_type, label_prefix)
+            record_strategy_result(strategy, True)
+            record_strategy_attempt(database, shape, strategy, True, time.perf_counter() - started_at)
+            store_resolution(database, title, resolved_url, strategy)
+            return outcome
+        except Exception as e:
+            # Timeouts here mean the search had no matching result, a page re-rendered under us is worth a retry
+            if classify_failure(e) == "stale":
+                raise
+            print_and_log(f"Couldn't find: {query}")
+            record_strategy_result(strategy, False)
+            record_strategy_attempt(database, shape, strategy, False, time.perf_counter() - started_at)
+
+    print_and_log(f"Error processing {title}: no search attempt found it")
+    return "not-found"
+
+# Step 2 (HTTP fast path): search and favorite with plain HTTP requests that reuse the browser's session cookies
+class HoerLiveHttpError(Exception):
+    def __init__(self, status, url, retry_after=None):
+        super().__init__(f"HTTP {status} for {url}")
+        self.status = status
+        self.url = url
+        self.retry_after = retry_after  # Seconds the server asked us to wait (429/503)
+
+class LinkParser(HTMLParser):
+    # Collects every link on a page with its classes, the classes of the elements around it and its text, plus the page heading
+    void_elements = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__()
+        self.links = []
+        self.heading = ""
+        self.open_elements = []
+        self.open_links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a":
+            link = {"href": attrs.get("href") or "",
+                    "class": attrs.get("class") or "",
+                    "parent_classes": " ".join(element_class for _, element_class in self.open_elements),
+                    "text": ""}
+            self.links.append(link)
+            self.open_links.append(link)
+        if tag not in self.void_elements:
+            self.open_elements.append((tag, attrs.get("class") or ""))
+
+    def handle_endtag(self, tag):
+        # Pop up to the matching element so unclosed tags don't break the nesting
+        for index in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[index][0] == tag:
+                del self.open_elements[index:]
+                break
+        if tag == "a" and self.open_links:
+            self.open_links.pop()
+
+    def handle_data(self, data):
+        for link in self.open_links:
+            link["text"] += data
+        if any(tag == "h1" for tag, _ in self.open_elements):
+            self.heading += data
+
+def parse_page(html):
+    parser = LinkParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+def parse_links(html):
+    return parse_page(html).links
+
+class HoerLiveHttpClient:
+    def __init__(self, website_url, cookies, user_agent, timeout=10, pool_size=2, rate=None):
+        import urllib3
+
+        self.website_url = website_url
+        # Optional AdaptiveRate shared with the browser of the same session
+        self.rate = rate
+        # Keep-alive connection pool shared by all requests of this session
+        self.http = urllib3.PoolManager(num_pools=2,
+                                        maxsize=pool_size,
+                                        timeout=urllib3.Timeout(total=timeout),
+                                        retries=urllib3.Retry(total=2, redirect=5, status_forcelist=()),
+                                        headers={"User-Agent": user_agent,
+                                                 "Cookie": "; ".join(f"{cookie['name']}={cookie['value']}" for cookie in cookies)})
+
+    @classmethod
+    def from_driver(cls, driver, website_url, timeout=10, rate=None):
+        return cls(website_url, get_session_cookies(driver, website_url), driver.execute_script("return navigator.userAgent"), timeout,
+                   rate=rate)
+
+    def close(self):
+        # Closes the kept-alive connections
+        self.http.clear()
+
+    def get_page(self, url):
+        if self.rate is not None:
+            self.rate.wait()
+        started_at = time.perf_counter()
+        try:
+            response = self.http.request("GET", url)
+            if response.status >= 400:
+                retry_after = response.headers.get("Retry-After")
+                raise HoerLiveHttpError(response.status, url, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        except Exception as e:
+            if self.rate is not None:
+                self.rate.record(failure=classify_failure(e))
+            raise
+        if self.rate is not None:
+            self.rate.record(latency=time.perf_counter() - started_at)
+        return response.data.decode("utf-8", errors="replace")
+
+    def find_result(self, query, result_type, label_prefix):
+        links = parse_links(self.get_page(get_search_url(self.website_url, query)))
+        for link in links:
+            if result_type == "artist":
+                if link["class"] == "result":
+                    return urljoin(self.website_url, link["href"])
+            elif link["class"] == "result no-ajax":
+                if result_type != "label" or label_prefix in link["text"]:
+                    return urljoin(self.website_url, link["href"])
+        return None
+
+    def favorite(self, url, strategy):
+        container_class = "show-card__info" if strategy == "artist_name" else "main-video__icons"
+        for link in parse_links(self.get_page(url)):
+            if container_class in link["parent_classes"].split() and "icon_favorite" in link["class"].split():
+                # Only the exact "not favorited" heart is a link that adds the favorite
+                if link["class"] != "icon icon_heart icon_favorite no-ajax":
+                    return "already-favorited"
+                if not link["href"] or link["href"].startswith(("#", "javascript:")):
+                    raise ValueError(f"Favorite link can't be followed without a browser: {url}")
+                self.get_page(urljoin(url, link["href"]))
+                return "favorited"
+        raise ValueError(f"No favorite icon found on {url}")
+
+@timed("title_http")
+def process_title_over_http(client, database, title, resolution_cache_ttl_days, catalog=None, catalog_match_threshold=0.8):
+    # Returns the outcome, or None when a request or page failed so the browser can take over. A title none of the result pages
+    # has is "not-found", the browser would send the same searches. Throttling and server errors are raised, the browser would run
+    # into them as well
     try:
-        driver = webdriver.Chrome(options=chrome_options)
-        print_and_log("Successfully connected to the browser.")
+        cached_resolution = get_cached_resolution(database, title, resolution_cache_ttl_days)
+        catalog_url = match_catalog_title(catalog, title, catalog_match_threshold) if cached_resolution is None else None
+        if cached_resolution is not None:
+            url, strategy = cached_resolution
+        elif catalog_url is not None:
+            url, strategy = catalog_url, "catalog_match"
+        else:
+            shape = get_title_shape(title)
+            for strategy, description, query, result_type, label_prefix in get_search_attempts(title, get_strategy_stats(database, shape, "http ")):
+                started_at = time.perf_counter()
+                with timed_step("http attempt " + strategy):
+                    url = client.find_result(query, result_type, label_prefix)
+                record_strategy_result("http " + strategy, url is not None)
+                record_strategy_attempt(database, shape, "http " + strategy, url is not None, time.perf_counter() - started_at)
+                if url is not None:
+                    break
+            else:
+                print_and_log(f"Error processing {title}: no search attempt found it (HTTP)")
+                return "not-found"
+
+        outcome = client.favorite(url, strategy)
+        print_and_log(f"{'Added to favorites' if outcome == 'favorited' else 'Already favorited'} (HTTP): {title}")
+        store_resolution(database, title, url, strategy)
+        return outcome
+    except Exception as e:
+        if classify_failure(e) in transient_failures:
+            raise
+        print_and_log(f"HTTP fast path failed for {title}, using the browser: {e}")
+        return None
+
+# Offline catalog of hoer.live sets, crawled once and matched against YouTube titles in memory
+def tokenize(text):
+    # Casefolded words without diacritics, so "HÖR", "HOER" and "Hor" or "Héctor" and "Hector" compare equal
+    text = unicodedata.normalize("NFKD", title_series_spellings.sub("HÖR", text).casefold())
+    text = "".join(character for character in text if not unicodedata.combining(character))
+    return re.findall(r"\w+", text)
+
+def character_ngrams(tokens, n=3):
+    text = " " + " ".join(tokens) + " "
+    return {text[index:index + n] for index in range(len(text) - n + 1)}
+
+def dice_similarity(first, second):
+    if not first or not second:
+        return 0.0
+    return 2 * len(first & second) / (len(first) + len(second))
+
+def describe_set_title(title):
+    parsed = parse_title(title)
+    return {"artist": parsed.artist, "label": parsed.label, "date": parsed.date}
+
+class CatalogIndex:
+    def __init__(self, entries):
+        self.entries = entries
+        self.tokens = []
+        self.ngrams = []
+        token_index = defaultdict(set)
+        for entry_number, entry in enumerate(entries):
+            tokens = set(tokenize(entry["title"]))
+            self.tokens.append(tokens)
+            self.ngrams.append(character_ngrams(sorted(tokens)))
+            for token in tokens:
+                token_index[token].add(entry_number)
+
+        # Words found in lots of titles ("hor", the year, ...) don't narrow down the candidates
+        common_token_limit = max(10, len(entries) // 5)
+        self.token_index = {token: entry_numbers for token, entry_numbers in token_index.items() if len(entry_numbers) <= common_token_limit}
+
+    @classmethod
+    def load(cls, catalog_file):
+        with open(catalog_file, "r", encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def match(self, title, threshold):
+        # Returns the best (entry, score) pair above the threshold, or None
+        tokens = set(tokenize(title))
+        ngrams = character_ngrams(sorted(tokens))
+        candidates = set()
+        for token in tokens:
+            candidates.update(self.token_index.get(token, ()))
+
+        best_entry, best_score = None, 0.0
+        for entry_number in candidates:
+            # Token-set similarity plus character trigrams to tolerate typos and different word splits
+            score = (dice_similarity(tokens, self.tokens[entry_number]) + dice_similarity(ngrams, self.ngrams[entry_number])) / 2
+            if score > best_score:
+                best_entry, best_score = self.entries[entry_number], score
+
+        if best_entry is None or best_score < threshold:
+            return None
+        return best_entry, best_score
+
+def build_ngram_matrix(texts, vocabulary, ngram_size, sparse, np):
+    # One row per text with a 1 for every known character n-gram, rows scaled to unit length for cosine similarity
+    rows, columns = [], []
+    norms = np.ones(len(texts), dtype=np.float32)
+    for row, text in enumerate(texts):
+        ngrams = character_ngrams(tokenize(text), ngram_size)
+        # Unknown n-grams still count towards the length of the row
+        norms[row] = max(1, len(ngrams)) ** 0.5
+        for ngram in ngrams:
+            column = vocabulary.get(ngram)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+    matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)), shape=(len(texts), len(vocabulary)))
+    return sparse.diags(1 / norms) @ matrix
+
+def match_titles_in_batch(titles, candidate_titles, top_k=3, ngram_size=3, chunk_size=1000, max_document_frequency=0.05):
+    # Returns, for every title, up to top_k (candidate index, score) pairs with the best cosine similarity first
+    import numpy as np
+    from scipy import sparse
+
+    if not candidate_titles:
+        return [[] for _ in titles]
+
+    document_frequencies = defaultdict(int)
+    for candidate_title in candidate_titles:
+        for ngram in character_ngrams(tokenize(candidate_title), ngram_size):
+            document_frequencies[ngram] += 1
+
+    # N-grams shared by lots of candidates ("hor", "202", ...) barely change the ranking but make the product dense
+    max_count = max(10, int(max_document_frequency * len(candidate_titles)))
+    vocabulary = {}
+    for ngram, count in document_frequencies.items():
+        if count <= max_count:
+            vocabulary[ngram] = len(vocabulary)
+
+    candidates = build_ngram_matrix(candidate_titles, vocabulary, ngram_size, sparse, np).T.tocsr()
+    top_k = min(top_k, len(candidate_titles))
+
+    matches = []
+    for start in range(0, len(titles), chunk_size):
+        chunk = build_ngram_matrix(titles[start:start + chunk_size], vocabulary, ngram_size, sparse, np)
+        scores = (chunk @ candidates).toarray()
+        # Pick the top_k columns per row without sorting the whole row
+        best = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        best_scores = np.take_along_axis(scores, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        best = np.take_along_axis(best, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        for row in range(len(best)):
+            matches.append([(int(index), float(score)) for index, score in zip(best[row], best_scores[row]) if score > 0])
+    return matches
+
+def load_catalog(catalog_file):
+    if not catalog_file or not os.path.exists(catalog_file):
+        return None
+    catalog = CatalogIndex.load(catalog_file)
+    print_and_log(f"Loaded {len(catalog.entries)} sets from {catalog_file}.")
+    return catalog
+
+def match_catalog_title(catalog, title, threshold):
+    # Returns the catalog URL for a title, or None when there's no catalog or no confident match
+    if catalog is None:
+        return None
+    match = catalog.match(title, threshold)
+    if match is None:
+        return None
+    entry, score = match
+    print_and_log(f"Matched {title} to {entry['title']} in the catalog (score {score:.2f}).")
+    return entry["url"]
+
+def read_sitemap_urls(client, sitemap_url):
+    # WordPress sitemaps: an index of sitemaps, each listing page URLs
+    urls = []
+    root = ElementTree.fromstring(client.get_page(sitemap_url))
+    for location in root.iter("{http://www.sitemaps.org/schemas/sitemap/0.9}loc"):
+        url = location.text.strip()
+        if root.tag.endswith("sitemapindex"):
+            # Users and taxonomies never link to sets
+            if "-users-" not in url and "-taxonomies-" not in url:
+                urls.extend(read_sitemap_urls(client, url))
+        else:
+            urls.append(url)
+    return urls
+
+def read_catalog_entry(client, url):
+    # Only set pages have the favorite icon in the video area
+    page = parse_page(client.get_page(url))
+    for link in page.links:
+        if "main-video__icons" in link["parent_classes"].split() and "icon_favorite" in link["class"].split():
+            title = " ".join(page.heading.split())
+            return {"title": title, "url": url, **describe_set_title(title)}
+    return None
+
+def crawl_catalog(website_url, catalog_file, concurrency=8):
+    client = HoerLiveHttpClient(website_url, [], "Mozilla/5.0 (hoer.live favorites updater)", pool_size=concurrency)
+
+    print_and_log("Reading the hoer.live sitemap...")
+    page_urls = read_sitemap_urls(client, urljoin(website_url, "wp-sitemap.xml"))
+
+    print_and_log(f"Reading {len(page_urls)} pages for the set catalog...")
+    entries = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in executor.map(lambda url: read_catalog_entry(client, url), page_urls):
+            if entry is not None and entry["title"]:
+                entries.append(entry)
+
+    with open(catalog_file, "w", encoding="utf-8") as file:
+        json.dump(entries, file, indent=4, ensure_ascii=False)
+    print_and_log(f"Saved {len(entries)} sets to {catalog_file}.")
+    return entries
+
+# The account's favorites list, read once per run so titles that are already favorited need no search or page load
+def read_favorites(client, favorites_url, max_pages=200, item_class="favorites__item"):
+    # Follows the "next" links of the paginated list and returns its items as {"title", "url"},
+    # only the list's own item links count, the menu and footer link sets and artists too
+    entries = []
+    page_url = favorites_url
+    read_page_urls = set()
+    while page_url and page_url not in read_page_urls and len(read_page_urls) < max_pages:
+        read_page_urls.add(page_url)
+        next_page_url = None
+        for link in parse_links(client.get_page(page_url)):
+            url = urljoin(page_url, link["href"])
+            link_classes = link["class"].split()
+            if "next" in link_classes:
+                next_page_url = url
+            elif item_class in link_classes and link["text"].strip():
+                entries.append({"title": " ".join(link["text"].split()), "url": url})
+        page_url = next_page_url
+    return entries
+
+class FavoritesIndex:
+    def __init__(self, item_class="favorites__item"):
+        self.item_class = item_class
+        self.lock = Lock()
+        self.loaded = False
+        self.paths = set()
+        self.titles = set()
+
+    def load_once(self, client, favorites_url):
+        # The first worker to log in reads the list, the others wait for it
+        with self.lock:
+            if self.loaded:
+                return
+            self.loaded = True
+            try:
+                with timed_step("favorites_list"):
+                    entries = read_favorites(client, favorites_url, item_class=self.item_class)
+            except Exception as e:
+                print_and_log(f"Couldn't read the favorites list, every title is checked on its page: {e}")
+                return
+            self.paths = {urlsplit(entry["url"]).path.rstrip("/") for entry in entries}
+            self.titles = {normalize_title(entry["title"]) for entry in entries}
+            if not entries:
+                # The page was readable, so either nothing is favorited yet or the list's links use another class
+                print_and_log(f"Warning: no favorites found on {favorites_url}, check \"favorites_item_class\" if the account has favorites.")
+                return
+            print_and_log(f"Read {len(entries)} favorites from the favorites list.")
+
+    def contains(self, title, urls):
+        # Only exact titles and pages count, a fuzzy match could skip a set that isn't favorited yet
+        return normalize_title(title) in self.titles or any(urlsplit(url).path.rstrip("/") in self.paths for url in urls)
+
+def is_already_favorited(favorites, database, catalog, title, resolution_cache_ttl_days, catalog_match_threshold):
+    # A title is skipped when its cached page, its catalog match or its own title is in the favorites list
+    if favorites is None or not favorites.paths:
+        return False
+    urls = []
+    cached_resolution = get_cached_resolution(database, title, resolution_cache_ttl_days)
+    if cached_resolution is not None:
+        urls.append(cached_resolution[0])
+    if catalog is not None:
+        match = catalog.match(title, catalog_match_threshold)
+        if match is not None:
+            urls.append(match[0]["url"])
+    found = favorites.contains(title, urls)
+    record_strategy_result("favorites_list", found)
+    return found
+
+def get_worker_session(worker_number):
+    # The first worker keeps the original debugger port and profile so existing sessions are reused
+    if worker_number == 0:
+        return 9222, "ChromeSession"
+    return 9222 + worker_number, f"ChromeSession{worker_number + 1}"
+
+def find_browser_process(port):
+    # The main process of a browser started by an earlier run, found by its debugger port
+    import psutil
+
+    argument = f"--remote-debugging-port={port}"
+    for process in psutil.process_iter(["cmdline"]):
+        try:
+            if argument in (process.info["cmdline"] or []) and argument not in (process.parent().cmdline() if process.parent() else []):
+                return process
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            # Processes of other users can't be inspected, they aren't ours
+            continue
+    return None
+
+class BrowserSession:
+    # One debug browser with its own port and profile and the driver connected to it
+    def __init__(self, slot, chrome_path, headless, startup_timeout, page_load_strategy="normal", blocked_url_patterns=()):
+        self.slot = slot
+        self.port, self.user_data_dir = get_worker_session(slot)
+        self.chrome_path = chrome_path
+        self.headless = headless
+        self.startup_timeout = startup_timeout
+        self.page_load_strategy = page_load_strategy
+        self.blocked_url_patterns = list(blocked_url_patterns)
+        self.driver = None
+        self.process = None
+        self.titles = 0
+
+    def start(self):
+        import psutil
+
+        with timed_step("chrome_startup"):
+            started_process = run_chrome_if_not_running(self.chrome_path, self.port, self.user_data_dir, self.headless, self.startup_timeout)
+            self.process = psutil.Process(started_process.pid) if started_process is not None else find_browser_process(self.port)
+
+            # Connect to the Chrome session
+            chrome_options = Options()
+            chrome_options.add_experimental_option("debuggerAddress", f"127.0.0.1:{self.port}")
+            chrome_options.page_load_strategy = self.page_load_strategy
+            self.driver = webdriver.Chrome(options=chrome_options)
+            self.block_urls()
+        self.titles = 0
+        return self
+
+    def block_urls(self):
+        # Images, media and trackers are never used by the automation, blocking applies to the current tab
+        if self.blocked_url_patterns:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.blocked_url_patterns})
+
+    def is_healthy(self):
+        # A crashed tab or a closed window shows up as an error on the simplest driver call
+        try:
+            return bool(self.driver.window_handles) and get_debugger_version(self.port) is not None
+        except Exception:
+            return False
+
+    def get_memory_mb(self):
+        # Resident memory of the browser and all its tab and helper processes
+        import psutil
+
+        if self.process is None:
+            return 0
+        try:
+            processes = [self.process] + self.process.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return 0
+        memory = 0
+        for process in processes:
+            try:
+                memory += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return memory / 2 ** 20
+
+    def close(self):
+        import psutil
+
+        try:
+            self.driver.execute_cdp_cmd("Browser.close", {})
+            closing = True
+        except Exception:
+            closing = False
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        if self.process is not None:
+            try:
+                if not closing:
+                    self.process.terminate()
+                self.process.wait(10)
+            except psutil.TimeoutExpired:
+                self.process.kill()
+            except psutil.NoSuchProcess:
+                pass
+
+class BrowserPool:
+    # Hands out connected browsers to the workers, recycles them after "recycle_after_titles" titles or above "recycle_memory_mb"
+    # and keeps "spare_count" warm browsers ready so a worker doesn't wait for a new one
+    def __init__(self, chrome_path, headless=False, worker_count=1, recycle_after_titles=0, recycle_memory_mb=0, spare_count=0,
+                 startup_timeout=30, page_load_strategy="normal", blocked_url_patterns=()):
+        self.chrome_path = chrome_path
+        self.headless = headless
+        self.worker_count = worker_count
+        self.recycle_after_titles = recycle_after_titles
+        self.recycle_memory_mb = recycle_memory_mb
+        self.spare_count = spare_count
+        self.startup_timeout = startup_timeout
+        self.page_load_strategy = page_load_strategy
+        self.blocked_url_patterns = blocked_url_patterns
+        self.lock = Lock()
+        self.used_slots = set()
+        self.spares = []
+        self.warming = 0
+        self.sessions = []
+
+    def take_slot(self, slot=None):
+        # The worker's own slot if it's free, else the lowest free one, so the profiles (and their saved logins) of earlier runs are reused
+        with self.lock:
+            if slot is None or slot in self.used_slots:
+                slot = 0
+                while slot in self.used_slots:
+                    slot += 1
+            self.used_slots.add(slot)
+            return slot
+
+    def start_session(self, slot):
+        try:
+            session = BrowserSession(slot, self.chrome_path, self.headless, self.startup_timeout, self.page_load_strategy,
+                                     self.blocked_url_patterns).start()
+        except Exception:
+            with self.lock:
+                self.used_slots.discard(slot)
+            raise
+        with self.lock:
+            self.sessions.append(session)
+        return session
+
+    def acquire(self, slot=None):
+        with self.lock:
+            if slot is None and self.spares:
+                return self.spares.pop(0)
+        return self.start_session(self.take_slot(slot))
+
+    def warm_up(self):
+        # Starts a spare browser in the background
+        with self.lock:
+            if len(self.spares) + self.warming >= self.spare_count:
+                return
+            self.warming += 1
+
+        def start_spare():
+            try:
+                session = self.start_session(self.take_slot())
+                with self.lock:
+                    self.spares.append(session)
+                print_and_log(f"Spare browser ready on port {session.port}.")
+            except Exception as e:
+                print_and_log(f"Failed to start a spare browser: {e}")
+            finally:
+                with self.lock:
+                    self.warming -= 1
+
+        Thread(target=start_spare, daemon=True).start()
+
+    def needs_recycling(self, session):
+        if not session.is_healthy():
+            print_and_log(f"Browser on port {session.port} doesn't respond, replacing it.")
+            return True
+        # Start the replacement a little before the limit is reached
+        if self.recycle_after_titles:
+            if session.titles >= self.recycle_after_titles * 0.9:
+                self.warm_up()
+            if session.titles >= self.recycle_after_titles:
+                print_and_log(f"Recycling the browser on port {session.port} after {session.titles} titles.")
+                return True
+        if self.recycle_memory_mb:
+            memory = session.get_memory_mb()
+            if memory >= self.recycle_memory_mb * 0.9:
+                self.warm_up()
+            if memory >= self.recycle_memory_mb:
+                print_and_log(f"Recycling the browser on port {session.port} using {memory:.0f} MB.")
+                return True
+        return False
+
+    def recycle(self, session):
+        with timed_step("browser_recycle"):
+            self.discard(session)
+            return self.acquire()
+
+    def discard(self, session):
+        session.close()
+        with self.lock:
+            self.sessions.remove(session)
+            self.used_slots.discard(session.slot)
+
+    def close_spares(self):
+        # Browsers of the workers stay open for the next run, spares beyond the worker count are closed
+        deadline = time.monotonic() + self.startup_timeout
+        while self.warming and time.monotonic() < deadline:
+            time.sleep(0.1)
+        with self.lock:
+            spares = [session for session in self.spares if session.slot >= self.worker_count]
+            self.spares = [session for session in self.spares if session.slot < self.worker_count]
+        for session in spares:
+            self.discard(session)
+
+    def close_all(self):
+        # Every browser the pool started, for runs that shouldn't leave any behind
+        deadline = time.monotonic() + self.startup_timeout
+        while self.warming and time.monotonic() < deadline:
+            time.sleep(0.1)
+        with self.lock:
+            sessions = list(self.sessions)
+            self.spares = []
+        for session in sessions:
+            self.discard(session)
+
+# Step 2: Automate browser interaction with Selenium (one worker per Chrome instance)
+def run_favorites_worker(worker_number, browser_pool, video_queue, website_url, username, password, stop_flag,
+                         cache_database, resolution_cache_ttl_days, batch, http_fast_path, catalog, catalog_match_threshold,
+                         title_retries=3, rate_settings=None, favorites=None, favorites_path="my-account/favorites/",
+                         direct_search=False, search_tab_count=0, results_writer=None, handed_back_videos=None, first_video=None):
+    # Returns True once the worker reached the end of the playlist, a title it couldn't finish is handed over to the other workers
+    import_selenium()
+
+    unfinished_title = first_video
+    database = None
+    http_client = None
+    try:
+        print_and_log(f"Starting browser automation (worker {worker_number + 1})...")
+        session = browser_pool.acquire(worker_number)
+        driver = session.driver
+        search_tabs = SearchTabs(session, search_tab_count) if search_tab_count > 1 else None
+        print_and_log(f"Successfully connected to the browser (worker {worker_number + 1}).")
 
         if login(username, password, driver, website_url, stop_flag):
-            for title in available_videos:
+            # SQLite connections can't be shared between threads
+            database = open_cache_database(cache_database)
+
+            # Requests of the HTTP fast path and titles in the browser are paced separately, a page load takes much longer than a request
+            rate_settings = dict(rate_settings or {})
+            browser_target_latency = rate_settings.pop("browser_target_latency", 4.0)
+            rate = AdaptiveRate(**rate_settings)
+            browser_rate = AdaptiveRate(**{**rate_settings, "target_latency": browser_target_latency})
+
+            if http_fast_path or favorites is not None:
+                http_client = HoerLiveHttpClient.from_driver(driver, website_url, wait_timeouts["page_load"], rate)
+            if favorites is not None:
+                favorites.load_once(http_client, urljoin(website_url, favorites_path))
+
+            next_video = first_video
+            while True:
+                video = next_video or get_video(video_queue, stop_flag, handed_back_videos)
+                next_video = None
 
                  # Check for the stop flag regularly
                 if stop_flag.is_set():
-                    return
-
-                try:
-                    # Step 2.1: Search with full video title
+                    return False
+
+                if video is None:
+                    break
+                title = unfinished_title = video
+
+                # Replace a browser that stopped responding or has grown too big between two titles
+                if browser_pool.needs_recycling(session):
+                    session = browser_pool.recycle(session)
+                    driver = session.driver
+                    search_tabs = SearchTabs(session, search_tab_count) if search_tab_count > 1 else None
+                    if not login(username, password, driver, website_url, stop_flag):
+                        print_and_log(f"Failed to log in with the new browser. Browser automation canceled (worker {worker_number + 1}).")
+                        handed_back_videos.append(title)
+                        return False
+
+                started_at = time.perf_counter()
+                outcome = None
+                from_favorites_list = is_already_favorited(favorites, database, catalog, title, resolution_cache_ttl_days, catalog_match_threshold)
+                if from_favorites_list:
+                    print_and_log(f"Already favorited (favorites list): {title}")
+                    outcome = "already-favorited"
+                if outcome is None and http_fast_path:
+                    try:
+                        outcome = retry_transient_failures(lambda: process_title_over_http(http_client, database, title, resolution_cache_ttl_days,
+                                                                                           catalog, catalog_match_threshold),
+                                                           title, stop_flag, title_retries)
+                    except Exception as e:
+                        print_and_log(f"HTTP fast path failed for {title}, using the browser: {e}")
+                if outcome is None and not stop_flag.is_set():
                     try:
-                        load_website(driver, website_url)
-                        toggle_search(driver, title)
-                        click_result_item(driver)
-                        click_favorite_icon(driver, title)
-                        continue
+                        outcome = retry_transient_failures(lambda: run_paced(browser_rate,
+                                                                             lambda: process_title(driver, database, website_url, title,
+                                                                                                   resolution_cache_ttl_days, stop_flag,
+                                                                                                   catalog, catalog_match_threshold,
+                                                                                                   direct_search, search_tabs),
+                                                                             stop_flag),
+                                                           title, stop_flag, title_retries)
                     except Exception as e:
-                        print_and_log(f"Couldn't find: {title}")
-
-                        if stop_flag.is_set():
-                            return
-
-                        # Step 2.2: Search with partial video title
-                        try:
-                            count_1 = title.count("|")
-                            count_2 = title.count("-")
-                        
-                            if count_1 > 0 and count_2 > 0:
-                                print_and_log(f"Retrying attempt 1: using first and last parts of the title...")
-                                split_title_part_1 = title.split("|")[0]
-                                split_title_part_2 = title.split("-")[-1] # gets the last part of the string
-                                toggle_search(driver, split_title_part_1 + split_title_part_2)
-                                click_result_item(driver)
-                                click_favorite_icon(driver, title)
-                                continue
-                            else:
-                                print_and_log(f"Retrying attempt 1: using the second half of the title...")
-                                split_title_part_2 = title.split("- ")[1] # gets the last part of the string
-                                toggle_search(driver, split_title_part_2)
-                                click_result_item(driver)
-                                click_favorite_icon(driver, title)
-                                continue
-                        except Exception as e:
-                            if count_1 > 0 and count_2 > 0:
-                                print_and_log(f"Couldn't find: {split_title_part_1 + split_title_part_2}")
-                            else:
-                                print_and_log(f"Couldn't find: {split_title_part_2}")
-
-                            if stop_flag.is_set():
-                                return
-                            
-                            try:
-                                if title.index("|") < title.index("-"):
-                                    print_and_log(f"Retrying attempt 2: using just the artist name...")
-                                    split_title_part_1 = title.split(" |")[0]
-                                    toggle_search(driver, split_title_part_1)
-                                    click_artist_result_item(driver)
-                                    click_artist_favorite_icon(driver, title)
-                                else:
-                                    print_and_log(f"Retrying attempt 2: using just the label name...")
-                                    split_title_label_part = title.split("- ")[0]
-                                    toggle_search(driver, split_title_label_part)
-                                    split_title_artist_part = title.split("- ")[1].split(" ")[0][0:3]
-                                    click_label_result_item(driver, split_title_artist_part)
-                                    click_favorite_icon(driver, title)
-                                continue
-                            except Exception as e:
-                                print_and_log(f"Error processing {title}: {e}")
-                                continue
+                        print_and_log(f"Error processing {title}: {e}")
+
+                # Record the outcome for every playlist video with this title, failed titles are retried on the next run
+                for playlist_url, video_id in batch.finish_title(title, outcome):
+                    if outcome is not None:
+                        record_outcome(database, playlist_url, video_id, title, outcome)
+                unfinished_title = None
+                batch.save_checkpoint()
+                record_title_done()
+                session.titles += 1
+                if results_writer is not None:
+                    # The page a found title was opened on is the one stored in the resolution cache
+                    resolution = get_stored_resolution(database, title) if outcome in ("favorited", "already-favorited") else None
+                    if from_favorites_list:
+                        resolution = (None, "favorites_list")
+                    results_writer.write(title, outcome, *(resolution or (None, None)), time.perf_counter() - started_at)
+
+            print_and_log(f"Browser automation finished (worker {worker_number + 1}).")
+            return True
+        else:
+            print_and_log(f"Failed to log in. Browser automation canceled (worker {worker_number + 1}).")
+            # Hand the video over to the other workers
+            if first_video is not None:
+                handed_back_videos.append(first_video)
+            return False
 
-                except Exception as e:
-                    print_and_log(f"Error processing {title}: {e}")
-                    continue
+    except Exception as e:
+        print_and_log(f"Failed to connect to the browser or encountered an error: {e}")
+        # Hand the title this worker was on over to the other workers
+        if unfinished_title is not None:
+            handed_back_videos.append(unfinished_title)
+        return False
+    finally:
+        # Every run opens its own connections, the browser is the only thing kept for the next run
+        if http_client is not None:
+            http_client.close()
+        if database is not None:
+            database.close()
+
+def automate_website_interaction(chrome_path, video_queue, website_url, username, password, stop_flag,
+                                 cache_database="hoer_live_cache.db", resolution_cache_ttl_days=30, resolution_cache_max_entries=5000,
+                                 batch=None, worker_count=1, max_worker_count=8, http_fast_path=False,
+                                 catalog_file="", catalog_match_threshold=0.8, headless=False, title_retries=3, rate_settings=None,
+                                 favorites_prefilter=True, favorites_path="my-account/favorites/", browser_settings=None,
+                                 direct_search=False, search_tab_count=0, results_file="", results_batch_size=50, keep_browsers_open=True,
+                                 favorites_item_class="favorites__item"):
+    if stop_flag.is_set():
+        return
+
+    if batch is None:
+        batch = PlaylistBatch([])
 
-            print_and_log("Browser automation finished.")
+    # Wait for the first video before starting any browser, runs without new videos don't need one
+    first_video = get_video(video_queue, stop_flag)
+    if first_video is None:
+        if not stop_flag.is_set():
+            print_and_log("No new videos to process.")
+        return
+
+    # Titles resolved on previous runs are opened directly instead of being searched for
+    database = open_cache_database(cache_database)
+    evict_resolution_cache(database, resolution_cache_ttl_days, resolution_cache_max_entries)
+    database.close()
+
+    # The catalog is read-only, so all workers share it
+    catalog = load_catalog(catalog_file)
+
+    # The favorites list is read once by the first worker that logs in and shared by all of them
+    favorites = FavoritesIndex(favorites_item_class) if favorites_prefilter else None
+
+    # Each worker takes the next title from the shared queue as soon as it's done with the previous one
+    worker_count = max(1, min(worker_count, max_worker_count))
+    browser_pool = BrowserPool(chrome_path, headless, worker_count, **(browser_settings or {}))
+    results_writer = ResultsWriter(results_file, results_batch_size) if results_file else None
+    print_and_log(f"Processing titles with {worker_count} browser worker(s) while the playlist is being read...")
+
+    # Each worker sets its entry once it reached the end of the playlist, titles of workers that failed are taken by the others
+    finished_workers = [False] * worker_count
+    handed_back_videos = deque()
+
+    def run_worker(worker_number):
+        finished_workers[worker_number] = run_favorites_worker(worker_number, browser_pool, video_queue, website_url, username, password,
+                                                               stop_flag, cache_database, resolution_cache_ttl_days, batch, http_fast_path,
+                                                               catalog, catalog_match_threshold, title_retries, rate_settings, favorites,
+                                                               favorites_path, direct_search, search_tab_count, results_writer,
+                                                               handed_back_videos, first_video if worker_number == 0 else None)
+
+    workers = []
+    for worker_number in range(worker_count):
+        worker = Thread(target=run_worker, args=(worker_number,))
+        worker.start()
+        workers.append(worker)
+
+    for worker in workers:
+        worker.join()
+    if keep_browsers_open:
+        browser_pool.close_spares()
+    else:
+        browser_pool.close_all()
+    if results_writer is not None:
+        results_writer.flush()
+        print_and_log(f"Results of every title saved to {results_file}.")
+
+    if not stop_flag.is_set() and not any(finished_workers):
+        # Without a working browser the playlist step would wait for the workers forever
+        stop_flag.set()
+        print_run_report()
+        raise RuntimeError("no browser worker could connect and log in")
+
+    if not stop_flag.is_set():
+        # Titles handed back after the other workers were done stay pending in the checkpoint of this run
+        left_over_titles = len(handed_back_videos)
+        while True:
+            try:
+                left_over_titles += video_queue.get_nowait() is not None
+            except queue.Empty:
+                break
+        video_queue.put(None)
+        if left_over_titles:
+            print_and_log(f"{left_over_titles} title(s) weren't processed, they are processed again on the next run.")
+
+    if not stop_flag.is_set():
+        print_and_log("Browser automation finished.")
+    print_run_report()
+
+# Runs step 1 with the saved parameters, returns False if the playlists couldn't be loaded
+def run_playlist_task(params, video_queue, stop_flag, batch):
+    try:
+        if params["process_full_playlist"]:
+            playlist_record_limit = 0
         else:
-            print_and_log("Failed to log in. Browser automation canceled.")
+            playlist_record_limit = params["playlist_record_limit"]
+        get_available_video_titles(list(batch.playlists), 
+                                   playlist_record_limit, 
+                                   video_queue,
+                                   stop_flag,
+                                   batch,
+                                   params["cache_database"],
+                                   params["full_resync"],
+                                   params["youtube_fetch_concurrency"],
+                                   params["youtube_fetch_retries"])
+        return True
+    except Exception as e:
+        print_and_log(f"Failed to load YouTube playlist. Error: {e}")
+        return False
 
+# Runs step 2 with the saved parameters, returns False if the automation failed
+def run_browser_task(params, video_queue, stop_flag, batch):
+    try:
+        # The lean profile runs without a window, doesn't wait for images and embeds and skips the homepage when searching
+        lean_browsing = params["lean_browsing"]
+        configure_waits(params["page_load_timeout"], params["element_timeout"], "eager" if lean_browsing else "normal")
+        automate_website_interaction(params["chrome_path"], 
+                                     video_queue, 
+                                     params["hoer_live_url"], 
+                                     params["hoer_live_username"], 
+                                     params["hoer_live_password"], 
+                                     stop_flag,
+                                     params["cache_database"],
+                                     params["resolution_cache_ttl_days"],
+                                     params["resolution_cache_max_entries"],
+                                     batch,
+                                     params["browser_worker_count"],
+                                     params["max_browser_worker_count"],
+                                     params["http_fast_path"],
+                                     params["catalog_file"],
+                                     params["catalog_match_threshold"],
+                                     params["headless"] or lean_browsing,
+                                     params["title_retries"],
+                                     {"initial_rate": params["initial_request_rate"],
+                                      "min_rate": params["min_request_rate"],
+                                      "max_rate": params["max_request_rate"],
+                                      "target_latency": params["target_request_latency_seconds"],
+                                      "browser_target_latency": params["target_page_load_seconds"]},
+                                     params["favorites_prefilter"],
+                                     params["favorites_path"],
+                                     {"recycle_after_titles": params["recycle_browser_after_titles"],
+                                      "recycle_memory_mb": params["recycle_browser_memory_mb"],
+                                      "spare_count": params["spare_browsers"],
+                                      "startup_timeout": params["browser_startup_timeout_seconds"],
+                                      "page_load_strategy": "eager" if lean_browsing else "normal",
+                                      "blocked_url_patterns": params["blocked_url_patterns"] if lean_browsing else []},
+                                     lean_browsing,
+                                     params["speculative_search_tabs"],
+                                     params["results_file"],
+                                     params["results_batch_size"],
+                                     params["keep_browsers_open"],
+                                     params["favorites_item_class"])
+        write_batch_results(batch, params["batch_results_file"])
+        return True
     except Exception as e:
-        print_and_log(f"Failed to connect to the browser or encountered an error: {e}")
+        print_and_log(f"Automation failed. Error: {e}")
+        stop_flag.set()
+        return False
+    finally:
+        finish_checkpoint(batch, stop_flag)
+
+# Orchestration: the playlist and browser steps run as asyncio tasks on an event loop thread of their own, the window and the
+# command line only subscribe to the progress events and ask the run to stop
+class AutomationRun:
+    def __init__(self, params, batch):
+        self.params = params
+        self.batch = batch
+        self.stop_flag = Event()
+        self.subscribers = []
+        self.loop = None
+        self.stop_requested = None
+        self.thread = None
+        self.status = None  # "finished", "failed", "stopped" or "timeout" once the run is over
+
+    def subscribe(self, callback):
+        # Callbacks get every event as a dict with a "type", they are called on the orchestration thread
+        self.subscribers.append(callback)
+
+    def publish(self, event_type, **fields):
+        event = {"type": event_type, **fields}
+        for callback in self.subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                print_and_log(f"Failed to handle the {event_type} event: {e}")
+
+    def publish_from_thread(self, event_type, **fields):
+        # Events of the step threads are handed to the orchestration thread, so the subscribers only ever run there
+        try:
+            self.loop.call_soon_threadsafe(functools.partial(self.publish, event_type, **fields))
+        except RuntimeError:
+            # The run is already over
+            pass
+
+    def start(self):
+        self.thread = Thread(target=asyncio.run, args=(self.run(),))
+        self.thread.start()
+
+    def stop(self):
+        # Returns right away, the steps stop at their next check of the stop flag and the run publishes "finished"
+        self.stop_flag.set()
+        if self.loop is not None:
+            try:
+                self.loop.call_soon_threadsafe(self.stop_requested.set)
+            except RuntimeError:
+                # The run is already over
+                pass
+
+    def wait(self, timeout=None):
+        self.thread.join(timeout)
+        return not self.thread.is_alive()
+
+    def run_in_thread(self, function, *args):
+        # Like asyncio.to_thread, but on a daemon thread: a step stuck in YouTube or Selenium can't keep the run or the process from ending
+        future = self.loop.create_future()
+
+        def set_result(result, error):
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+        def target():
+            result, error = None, None
+            try:
+                result = function(*args)
+            except Exception as e:
+                error = e
+            try:
+                self.loop.call_soon_threadsafe(set_result, result, error)
+            except RuntimeError:
+                # The run gave up on this step and is already over
+                pass
+
+        Thread(target=target, daemon=True).start()
+        return future
+
+    async def publish_progress(self, video_queue):
+        while True:
+            self.publish("progress", titles_done=get_titles_done(), titles_queued=video_queue.qsize())
+            await asyncio.sleep(1)
+
+    async def run(self):
+        # The event has to exist before stop() can see the loop
+        self.stop_requested = asyncio.Event()
+        self.loop = asyncio.get_running_loop()
+        if self.stop_flag.is_set():
+            self.stop_requested.set()
+        params = self.params
+
+        start_run_report(params["timings_file"])
+        video_queue = queue.Queue(maxsize=params["pipeline_queue_size"])
+        self.batch.listeners.append(lambda title, outcome: self.publish_from_thread("title_done", title=title, outcome=outcome))
+        self.publish("started", playlists=list(self.batch.playlists))
+
+        # The steps block on YouTube and Selenium, so they run in worker threads and are stopped through the stop flag
+        playlist_task = self.run_in_thread(run_playlist_task, params, video_queue, self.stop_flag, self.batch)
+        browser_task = self.run_in_thread(run_browser_task, params, video_queue, self.stop_flag, self.batch)
+        progress_task = asyncio.create_task(self.publish_progress(video_queue))
+        stop_task = asyncio.create_task(self.stop_requested.wait())
+
+        # After a stop or the timeout the steps get "stop_grace_seconds" to finish their current title
+        stop_reason = None
+        deadline = self.loop.time() + params["run_timeout_minutes"] * 60 if params["run_timeout_minutes"] > 0 else None
+        pending = {playlist_task, browser_task}
+        while pending:
+            if stop_reason is None:
+                timeout = None if deadline is None else max(0, deadline - self.loop.time())
+            else:
+                timeout = max(0, grace_deadline - self.loop.time())
+            done, pending = await asyncio.wait(pending if stop_reason else pending | {stop_task}, timeout=timeout,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            pending.discard(stop_task)
+            if stop_reason is None and (stop_task in done or not done):
+                stop_reason = "stopped" if done else "timeout"
+                grace_deadline = self.loop.time() + params["stop_grace_seconds"]
+                self.stop_flag.set()
+                self.publish("stopping", reason=stop_reason)
+            elif stop_reason is not None and not done:
+                print_and_log(f"The automation didn't stop within {params['stop_grace_seconds']} seconds, giving up on it.")
+                break
+        progress_task.cancel()
+        stop_task.cancel()
+
+        playlist_loaded = playlist_task.done() and playlist_task.result()
+        automation_succeeded = browser_task.done() and browser_task.result()
+        # Steps still running after the grace period can only follow a stop or the timeout
+        if stop_reason is not None:
+            self.status = stop_reason
+        elif not playlist_loaded or not automation_succeeded:
+            self.status = "failed"
+        elif self.stop_flag.is_set():
+            self.status = "stopped"
+        else:
+            self.status = "finished"
+        self.publish("finished", status=self.status, playlist_loaded=playlist_loaded, automation_succeeded=automation_succeeded,
+                     titles_done=get_titles_done())
+
+# Command line mode: runs both steps without the window, e.g. from cron
+def run_headless(params, resume=False):
+    if not check_run_settings(params):
+        return 1
+    automation_run = AutomationRun(params, create_batch(params, resume))
+
+    def print_event(event):
+        if event["type"] == "stopping":
+            print_and_log(f"Stopping automation ({event['reason']})...")
+        elif event["type"] == "finished":
+            # A stop can cut the steps short, which isn't a failure of the playlist or the automation
+            if event["status"] in ("stopped", "timeout"):
+                print_and_log(f"Automation {event['status']} after {event['titles_done']} titles.")
+            elif not event["playlist_loaded"]:
+                print_and_error("Failed to load the YouTube playlist! Check playlist permissions or URL!")
+            elif not event["automation_succeeded"]:
+                print_and_error("Automation failed! Check input parameters!")
+            else:
+                print_and_log(f"Automation {event['status']} after {event['titles_done']} titles.")
+
+    automation_run.subscribe(print_event)
+    automation_run.start()
+    try:
+        # Short joins so Ctrl+C is handled while the run goes on
+        while not automation_run.wait(0.5):
+            pass
+    except KeyboardInterrupt:
+        automation_run.stop()
+        automation_run.wait()
+    return 0 if automation_run.status == "finished" else 1
+
+def find_chrome():
+    # Chrome or Chromium on the PATH (Linux), used when no chrome_path is configured
+    for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"):
+        path = shutil.which(name)
+        if path:
+            return path
+    return ""
+
+def apply_command_line_arguments(params, args):
+    # Command line arguments and environment variables override configuration.json
+    if args.playlist_url:
+        params["youtube_playlist_url"] = " ".join(args.playlist_url)
+        params["youtube_playlist_urls"] = []
+        # Only the playlists given on the command line, unless a playlists file is given too
+        params["youtube_playlists_file"] = ""
+    if args.playlists_file:
+        params["youtube_playlists_file"] = args.playlists_file
+    if args.limit is not None:
+        params["process_full_playlist"] = args.limit == 0
+        params["playlist_record_limit"] = args.limit
+    if args.workers is not None:
+        params["browser_worker_count"] = args.workers
+    if args.headless:
+        params["headless"] = True
+    if args.lean:
+        params["lean_browsing"] = True
+    if args.full_resync:
+        params["full_resync"] = True
+    if args.chrome_path:
+        params["chrome_path"] = args.chrome_path
+    params["hoer_live_username"] = os.environ.get("HOER_LIVE_USERNAME", params["hoer_live_username"])
+    params["hoer_live_password"] = os.environ.get("HOER_LIVE_PASSWORD", params["hoer_live_password"])
+    if not params["chrome_path"]:
+        params["chrome_path"] = find_chrome()
+    return params
 
 class App:
     def __init__(self, root):
         self.root = root
         self.root.title("hoer.live Favorites Updater")
 
-        # Automation control flag
-        self.stop_flag = Event()
-        self.automation_thread = None
-        self.video_titles = None  # Store the automation result here
+        # Current run, the window follows it through its events
+        self.automation_run = None
 
-        # Set the window size to 900x400 (width x height)
-        root.geometry("850x420")
+        # Set the window size to 850x470 (width x height)
+        root.geometry("850x470")
         
         # Create labels and entry boxes for the parameters
         self.chrome_path_label = tk.Label(root, text="chrome.exe Path:")
@@ -435,7 +2797,7 @@ class App:
         self.submit_button = tk.Button(root, text="Browse", command=lambda: self.file_browse())
         self.submit_button.grid(row=0, column=5, padx=5, pady=10)
 
-        self.youtube_playlist_url_label = tk.Label(root, text="YouTube Playlist URL:")
+        self.youtube_playlist_url_label = tk.Label(root, text="YouTube Playlist URL(s):")
         self.youtube_playlist_url_label.grid(row=1, column=0, padx=5, pady=10, sticky="E")
         self.youtube_playlist_url_var = tk.StringVar()
         self.youtube_playlist_url_var.trace_add("write", self.on_input_change)
@@ -485,15 +2847,23 @@ class App:
         self.playlist_record_limit_entry.grid(row=6, column=1, padx=5, pady=10)
         self.bind_events(self.playlist_record_limit_entry)
 
+        self.full_resync_checkbox_var = tk.BooleanVar()
+        self.full_resync_checkbox_entry = tk.Checkbutton(root,
+                                                         text="Force a full resync (also process videos handled on previous runs)",
+                                                         variable=self.full_resync_checkbox_var,
+                                                         command=self.on_input_change)
+        self.full_resync_checkbox_entry.grid(row=7, column=0, columnspan=2, padx=5, pady=10, sticky="W")
+        self.bind_events(self.full_resync_checkbox_entry)
+
         # Create buttons
         self.automation_start_button = tk.Button(root, text="Start Automation", command=self.start_automation)
-        self.automation_start_button.grid(row=7, column=0, columnspan=1, pady=20)
+        self.automation_start_button.grid(row=8, column=0, columnspan=1, pady=20)
         self.automation_stop_button = tk.Button(root, text="Stop Automation", command=self.stop_automation, state=tk.DISABLED)
-        self.automation_stop_button.grid(row=8, column=0, columnspan=1, pady=20)
+        self.automation_stop_button.grid(row=9, column=0, columnspan=1, pady=20)
         self.configuration_save_button = tk.Button(root, text="Save Configuration", command=self.save)
-        self.configuration_save_button.grid(row=7, column=1, columnspan=1, pady=20)
+        self.configuration_save_button.grid(row=8, column=1, columnspan=1, pady=20)
         self.configuration_load_button = tk.Button(root, text="Load Configuration", command=self.load, state=tk.DISABLED)
-        self.configuration_load_button.grid(row=8, column=1, columnspan=1, pady=20)
+        self.configuration_load_button.grid(row=9, column=1, columnspan=1, pady=20)
 
         self.load()
 
@@ -507,95 +2877,57 @@ class App:
             self.chrome_path_entry.insert(0, file_path)
             self.params["chrome_path"] = file_path
 
-    def run_task_with_result(self):
-        # Run the task and store the result in `self.video_titles`
-        try:
-            if self.params["process_full_playlist"]:
-                self.video_titles = get_available_video_titles(self.params["youtube_playlist_url"], 
-                                                               0, 
-                                                               self.stop_flag)
-            else:
-                self.video_titles = get_available_video_titles(self.params["youtube_playlist_url"], 
-                                                               self.params["playlist_record_limit"], 
-                                                               self.stop_flag)
-        except Exception as e:
-            print_and_log(f"Failed to load YouTube playlist. Error: {e}")
-            return None
-
-    def run_task_without_result(self):
-        try:
-            automate_website_interaction(self.params["chrome_path"], 
-                                        self.video_titles, 
-                                        self.params["hoer_live_url"], 
-                                        self.params["hoer_live_username"], 
-                                        self.params["hoer_live_password"], 
-                                        self.stop_flag)
-        except Exception as e:
-            print_and_log(f"Automation failed. Error: {e}")
-            print_and_error("Automation failed!\n\nCheck input parameters!")
-            self.automation_stop_button.config(state=tk.DISABLED)
-            self.automation_start_button.config(state=tk.NORMAL)
-            self.stop_flag.set()
+    def ask_to_resume(self):
+        # Offer to continue an interrupted run of the same playlists
+        checkpoint = load_checkpoint(self.params["checkpoint_file"])
+        if checkpoint is None or list(checkpoint["playlists"]) != get_playlist_urls(self.params):
+            return False
+        return messagebox.askyesno("Resume", f"The last run of this playlist was interrupted ({describe_checkpoint(checkpoint)}).\n\n"
+                                             "Continue where it stopped?")
 
-        if self.stop_flag.is_set():
+    def start_automation(self):
+        if not check_run_settings(self.params):
             return
-        else:    
-            self.automation_stop_button.config(state=tk.DISABLED)
-            self.automation_start_button.config(state=tk.NORMAL)
-            print_and_log("Automation finished.")
 
-    def start_automation(self):
         # Enable stop button, disable start button
         self.automation_stop_button.config(state=tk.NORMAL)
         self.automation_start_button.config(state=tk.DISABLED)
 
         print("Automation started...")
 
-        # Clear the stop flag and start a new automation thread
-        self.stop_flag.clear()
-        
-        try:
-            self.automation_thread = Thread(target=self.run_task_with_result)
-            self.automation_thread.start()
-        except Exception as e:
-            print(f"Failed to load YouTube playlist. Error: {e}")
-            self.video_titles = None  
-
-        # Check thread status periodically
-        self.root.after(100, self.check_thread_status)
-
-    def check_thread_status(self):
-        # Check if the first thread processing is finished to continue the automation
-        if self.automation_thread and not self.automation_thread.is_alive():
-            if self.video_titles != None:
-                self.automation_thread = Thread(target=self.run_task_without_result)
-                self.automation_thread.start()
-            else:
-                print_and_error("Failed to load the YouTube playlist!\n\nCheck playlist permissions or URL!")
-                self.automation_stop_button.config(state=tk.DISABLED)
-                self.automation_start_button.config(state=tk.NORMAL)
+        self.automation_run = AutomationRun(self.params, create_batch(self.params, self.ask_to_resume()))
+        self.automation_run.subscribe(self.on_run_event)
+        self.automation_run.start()
+
+    def on_run_event(self, event):
+        # Called on the orchestration thread, Tk is only touched from the main loop
+        if event["type"] == "finished":
+            self.root.after(0, self.on_run_finished, event)
+
+    def on_run_finished(self, event):
+        self.automation_stop_button.config(state=tk.DISABLED)
+        self.automation_start_button.config(state=tk.NORMAL)
+        # A stop can cut the steps short, which isn't a failure of the playlist or the automation
+        if event["status"] in ("stopped", "timeout"):
+            print_and_log("Automation stopped.")
+        elif not event["playlist_loaded"]:
+            print_and_error("Failed to load the YouTube playlist!\n\nCheck playlist permissions or URL!")
+        elif not event["automation_succeeded"]:
+            print_and_error("Automation failed!\n\nCheck input parameters!")
         else:
-            # Check again after 100ms
-            self.root.after(100, self.check_thread_status)
+            print_and_log("Automation finished.")
 
     def stop_automation(self):
+        if self.automation_run is None:
+            return
         print_and_log("Stopping automation...")
 
-        # Set the stop flag to request the thread to stop
-        self.stop_flag.set()
+        # Ask the run to stop, the start button comes back with the "finished" event
+        self.automation_run.stop()
 
         # Disable stop button until automation finishes
         self.automation_stop_button.config(state=tk.DISABLED)
 
-        # Wait for the automation thread to finish
-        if self.automation_thread is not None:
-            self.automation_thread.join()
-
-        # Re-enable start button after stopping
-        self.automation_start_button.config(state=tk.NORMAL)
-
-        print_and_log("Automation stopped.")
-
     def bind_events(self, entry):
         # Bind events to detect any input change, including paste and mouse actions
         entry.bind("<KeyRelease>", self.on_input_change)
@@ -635,7 +2967,8 @@ class App:
                     self.params["hoer_live_username"] != self.hoer_live_username_var.get() or 
                     self.params["hoer_live_password"] != self.hoer_live_password_var.get() or
                     self.params["process_full_playlist"] != self.process_full_playlist_checkbox_var.get() or
-                    self.params["playlist_record_limit"] != int(self.playlist_record_limit_var.get().strip() or 0)):
+                    self.params["playlist_record_limit"] != int(self.playlist_record_limit_var.get().strip() or 0) or
+                    self.params["full_resync"] != self.full_resync_checkbox_var.get()):
                     self.automation_start_button.config(state=tk.DISABLED)
                     self.configuration_save_button.config(state=tk.NORMAL)
                     self.configuration_load_button.config(state=tk.NORMAL)
@@ -659,6 +2992,7 @@ class App:
         self.hoer_live_password_var.set(self.params.get("hoer_live_password", ""))
         self.process_full_playlist_checkbox_var.set(self.params.get("process_full_playlist"))
         self.playlist_record_limit_var.set(self.params.get("playlist_record_limit", ""))
+        self.full_resync_checkbox_var.set(self.params.get("full_resync"))
 
     def save(self):
         # Get values from entry field variables
@@ -669,6 +3003,7 @@ class App:
         self.params["hoer_live_password"] = self.hoer_live_password_var.get()
         self.params["process_full_playlist"] = self.process_full_playlist_checkbox_var.get()
         self.params["playlist_record_limit"] = int(self.playlist_record_limit_var.get().strip() or 0)
+        self.params["full_resync"] = self.full_resync_checkbox_var.get()
 
         # Save to JSON file
         save_configuration(self.params)
@@ -679,7 +3014,35 @@ class App:
 
 # Main function to control steps
 def main():
+    parser = argparse.ArgumentParser(description="Updates the favorites list of your hoer.live account from a YouTube playlist. "
+                                                 "Without --cli the window is opened.")
+    parser.add_argument("--cli", action="store_true", help="run without the window (credentials can be set with the "
+                                                           "HOER_LIVE_USERNAME and HOER_LIVE_PASSWORD environment variables)")
+    parser.add_argument("--config", default="configuration.json", help="configuration file (default: configuration.json)")
+    parser.add_argument("--playlist-url", action="append", help="YouTube playlist URL (repeat for a batch of playlists)")
+    parser.add_argument("--playlists-file", help="text file with one YouTube playlist URL per line")
+    parser.add_argument("--limit", type=int, help="number of playlist records to process (0 for the full playlist)")
+    parser.add_argument("--workers", type=int, help="number of browser workers")
+    parser.add_argument("--headless", action="store_true", help="run Chrome without a window")
+    parser.add_argument("--lean", action="store_true", help="lean browsing: headless, no images, media or trackers (fonts and SVGs still load), direct search URLs")
+    parser.add_argument("--full-resync", action="store_true", help="also process videos handled on previous runs")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted run from its checkpoint")
+    parser.add_argument("--chrome-path", help="Chrome or Chromium executable")
+    parser.add_argument("--crawl-catalog", action="store_true",
+                        help="download the hoer.live set catalog used for offline title matching and exit")
+    args = parser.parse_args()
+
+    if args.crawl_catalog:
+        params = load_configuration(args.config)
+        crawl_catalog(params["hoer_live_url"], params["catalog_file"])
+        return
+
+    if args.cli:
+        params = apply_command_line_arguments(load_configuration(args.config), args)
+        sys.exit(run_headless(params, args.resume))
+
     # Create the application window
+    import_gui()
     root = tk.Tk()
     app = App(root)
     root.mainloop()
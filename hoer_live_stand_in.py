@@ -0,0 +1,222 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs, quote
+from html import escape
+import argparse
+import json
+import re
+import time
+
+# Local stand-in for hoer.live that serves the search results, favorite links, favorites list, login form, popups and sitemap the updater relies on.
+# Start it with "python hoer_live_stand_in.py" and set "hoer_live_url" to "http://127.0.0.1:8000/".
+
+SESSION_COOKIE = "wordpress_logged_in_stand_in"
+
+default_catalog = [
+    {"title": "Ben Klock | HÖR - Dec 12 / 2023", "artist": "Ben Klock"},
+    {"title": "DJ Stingray 313 | HÖR - Jan 9 / 2024", "artist": "DJ Stingray 313"},
+    {"title": "Ostgut Ton - Marcel Dettmann | HÖR - Feb 2 / 2024", "artist": "Marcel Dettmann"},
+    {"title": "Héctor Oaks | HÖR - Mar 15 / 2024", "artist": "Héctor Oaks"},
+    {"title": "Kobosil b2b Nur Jaber | HÖR - Apr 20 / 2024", "artist": "Kobosil"},
+]
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.casefold()).strip("-")
+
+class StandInState:
+    def __init__(self, catalog):
+        self.sets = {slugify(item["title"]): item for item in catalog}
+        self.artists = {slugify(item["artist"]): item["artist"] for item in catalog}
+        self.favorites = set()
+
+    def search(self, query):
+        # Every word of the query has to appear in the set title
+        words = query.casefold().split()
+        sets = [(slug, item) for slug, item in self.sets.items() if all(word in item["title"].casefold() for word in words)]
+        artists = [(slug, name) for slug, name in self.artists.items() if words and all(word in name.casefold() for word in words)]
+        return sets, artists
+
+# Login popup opened by the user letter, the credentials form shows up after "Next" and posts to /login/
+login_popup = """<div class="login-popup" style="display: none">
+<button class="magic-form__next button button_green" onclick="this.nextElementSibling.style.display = 'block'">Next</button>
+<form method="post" action="/login/" style="display: none">
+<input type="text" id="username" name="username">
+<input type="password" id="password" name="password">
+<button class="woocommerce-button button woocommerce-form-login__submit" type="submit">Log in</button>
+</form>
+</div>"""
+
+# Newsletter popup and cookie banner, dismissed for the rest of the session once closed
+popups = """<div class="popup"><span class="popup__close" onclick="document.cookie = 'popup_closed=1; path=/'; this.parentNode.style.display = 'none'">×</span></div>"""
+cookie_banner = """<div class="cookie-consent"><button class="cookie-consent__accept button-white" onclick="document.cookie = 'cookie_consent=1; path=/'; this.parentNode.style.display = 'none'">Accept</button></div>"""
+
+def render_page(body, logged_in, cookies=""):
+    if logged_in:
+        account_link = '<a href="/my-account/edit-account/">Account</a>'
+    else:
+        account_link = '<span class="user-letter__text" onclick="document.querySelector(\'.login-popup\').style.display = \'block\'">?</span>' + login_popup
+    banners = ("" if "popup_closed=" in cookies else popups) + ("" if "cookie_consent=" in cookies else cookie_banner)
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>HÖR stand-in</title></head>
+<body>
+{banners}
+<header>
+<div class="hamburger hamburger--slider js-hamburger" style="display: none"></div>
+{account_link}
+<span class="icon icon_search toggle-search"></span>
+<div class="search">
+<div class="search__close toggle-search" style="display: none"></div>
+<form action="/" method="get"><input type="text" name="s"></form>
+</div>
+</header>
+<main>
+{body}
+</main>
+</body>
+</html>"""
+
+def render_favorite_icon(path, favorited):
+    if favorited:
+        return '<a class="icon icon_heart icon_favorite icon_favorite_active no-ajax" href="#"></a>'
+    return f'<a class="icon icon_heart icon_favorite no-ajax" href="{path}?favorite=1"></a>'
+
+class StandInHandler(BaseHTTPRequestHandler):
+    state = None
+    latency = 0.0  # Seconds added to every response, to simulate the real site's response times
+    favorites_page_size = 20
+
+    def is_logged_in(self):
+        return SESSION_COOKIE + "=" in (self.headers.get("Cookie") or "")
+
+    def render_page(self, body):
+        return render_page(body, self.is_logged_in(), self.headers.get("Cookie") or "")
+
+    def send_html(self, status, html):
+        data = html.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def base_url(self):
+        return f"http://{self.headers.get('Host')}"
+
+    def send_sitemap(self, root_tag, item_tag, urls):
+        items = "".join(f"<{item_tag}><loc>{escape(url)}</loc></{item_tag}>" for url in urls)
+        data = f'<?xml version="1.0" encoding="UTF-8"?><{root_tag} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{items}</{root_tag}>'.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location, headers=()):
+        self.send_response(302)
+        self.send_header("Location", location)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def render_favorites(self, page):
+        # The favorites list, paginated like the real account page
+        paths = sorted(self.state.favorites)[(page - 1) * self.favorites_page_size:page * self.favorites_page_size]
+        items = []
+        for path in paths:
+            slug = path.split("/")[2]
+            name = self.state.sets[slug]["title"] if path.startswith("/sets/") else self.state.artists[slug]
+            items.append(f'<a class="favorites__item" href="{path}">{escape(name)}</a>')
+        if page * self.favorites_page_size < len(self.state.favorites):
+            items.append(f'<a class="next page-numbers" href="/my-account/favorites/page/{page + 1}/">Next</a>')
+        return '<div class="favorites">' + "".join(items) + "</div>"
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        form = parse_qs(self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode("utf-8"))
+        if urlsplit(self.path).path == "/login/" and form.get("username") and form.get("password"):
+            self.redirect("/", [("Set-Cookie", f"{SESSION_COOKIE}={quote(form['username'][0])}; Path=/")])
+        else:
+            self.send_html(403, self.render_page("Wrong username or password."))
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        logged_in = self.is_logged_in()
+
+        if url.path == "/" and "s" in query:
+            sets, artists = self.state.search(query["s"][0])
+            results = [f'<a class="result no-ajax" href="/sets/{slug}/"><span class="result__title">{escape(item["title"])}</span></a>' for slug, item in sets]
+            results += [f'<a class="result" href="/artists/{slug}/"><span class="result__title">{escape(name)}</span></a>' for slug, name in artists]
+            self.send_html(200, self.render_page('<div class="search__results">' + "".join(results) + "</div>"))
+        elif url.path == "/":
+            self.send_html(200, self.render_page(""))
+        elif url.path.startswith("/sets/") and url.path.split("/")[2] in self.state.sets:
+            slug = url.path.split("/")[2]
+            if "favorite" in query:
+                if not logged_in:
+                    self.send_html(403, self.render_page("Log in to add favorites."))
+                    return
+                self.state.favorites.add(url.path)
+                self.redirect(url.path)
+                return
+            icon = render_favorite_icon(url.path, url.path in self.state.favorites)
+            self.send_html(200, self.render_page(f'<h1>{escape(self.state.sets[slug]["title"])}</h1><div class="main-video__icons">{icon}</div>'))
+        elif url.path.startswith("/artists/") and url.path.split("/")[2] in self.state.artists:
+            slug = url.path.split("/")[2]
+            if "favorite" in query:
+                if not logged_in:
+                    self.send_html(403, self.render_page("Log in to add favorites."))
+                    return
+                self.state.favorites.add(url.path)
+                self.redirect(url.path)
+                return
+            icon = render_favorite_icon(url.path, url.path in self.state.favorites)
+            self.send_html(200, self.render_page(f'<div class="show-card__info"><h1>{escape(self.state.artists[slug])}</h1>{icon}</div>'))
+        elif re.fullmatch(r"/my-account/favorites/(page/\d+/)?", url.path):
+            if not logged_in:
+                self.send_html(403, self.render_page("Log in to see your favorites."))
+                return
+            self.send_html(200, self.render_page(self.render_favorites(int(url.path.split("/")[-2]) if "/page/" in url.path else 1)))
+        elif url.path == "/wp-sitemap.xml":
+            self.send_sitemap("sitemapindex", "sitemap", [f"{self.base_url()}/wp-sitemap-posts-sets-1.xml",
+                                                          f"{self.base_url()}/wp-sitemap-posts-artists-1.xml",
+                                                          f"{self.base_url()}/wp-sitemap-users-1.xml"])
+        elif url.path == "/wp-sitemap-posts-sets-1.xml":
+            self.send_sitemap("urlset", "url", [f"{self.base_url()}/sets/{slug}/" for slug in self.state.sets])
+        elif url.path == "/wp-sitemap-posts-artists-1.xml":
+            self.send_sitemap("urlset", "url", [f"{self.base_url()}/artists/{slug}/" for slug in self.state.artists])
+        elif url.path == "/login/":
+            # Shortcut for tests: log in without a form
+            self.redirect("/", [("Set-Cookie", f"{SESSION_COOKIE}={quote(query.get('user', ['stand-in'])[0])}; Path=/")])
+        else:
+            self.send_html(404, self.render_page("Not found."))
+
+    def log_message(self, format, *args):
+        pass
+
+def create_server(host, port, catalog, latency=0.0):
+    StandInHandler.state = StandInState(catalog)
+    StandInHandler.latency = latency
+    return ThreadingHTTPServer((host, port), StandInHandler)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for hoer.live search and favorite pages.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--catalog", help="JSON file with a list of {\"title\": ..., \"artist\": ...} sets")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+
+    catalog = default_catalog
+    if args.catalog:
+        with open(args.catalog, "r", encoding="utf-8") as file:
+            catalog = json.load(file)
+
+    server = create_server(args.host, args.port, catalog, args.latency)
+    print(f"Serving hoer.live stand-in on http://{args.host}:{args.port}/")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+from threading import Thread
+import unittest
+
+import hoer_live_favorites_updater as updater
+from hoer_live_stand_in import create_server, SESSION_COOKIE
+
+# Runs the HTTP fast path against the local hoer.live stand-in, with "python -m unittest" (needs urllib3, which comes with Selenium)
+
+class HttpFastPathTest(unittest.TestCase):
+    def setUp(self):
+        self.server = create_server("127.0.0.1", 0, [{"title": "Ben Klock | HÖR - Dec 12 / 2023", "artist": "Ben Klock"},
+                                                     {"title": "Ostgut Ton - Marcel Dettmann | HÖR - Feb 2 / 2024", "artist": "Marcel Dettmann"}])
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        self.website_url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.state = self.server.RequestHandlerClass.state
+        self.database = updater.open_cache_database(":memory:")
+
+    def tearDown(self):
+        self.database.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_client(self, logged_in=True):
+        cookies = [{"name": SESSION_COOKIE, "value": "test"}] if logged_in else []
+        return updater.HoerLiveHttpClient(self.website_url, cookies, "test")
+
+    def process_title(self, client, title):
+        return updater.process_title_over_http(client, self.database, title, 30)
+
+    def test_search_result_is_favorited(self):
+        client = self.create_client()
+        self.assertEqual(self.process_title(client, "BEN KLOCK | HOER – Dec 12 / 2023"), "favorited")
+        self.assertEqual(self.state.favorites, {"/sets/ben-klock-h-r-dec-12-2023/"})
+        url, strategy = updater.get_stored_resolution(self.database, "Ben Klock | HÖR - Dec 12 / 2023")
+        self.assertTrue(url.endswith("/sets/ben-klock-h-r-dec-12-2023/"))
+        self.assertEqual(strategy, "full_title")
+
+    def test_cached_page_is_already_favorited(self):
+        client = self.create_client()
+        self.process_title(client, "Ben Klock | HÖR - Dec 12 / 2023")
+        self.assertEqual(self.process_title(client, "Ben Klock | HÖR - Dec 12 / 2023"), "already-favorited")
+        self.assertEqual(len(self.state.favorites), 1)
+
+    def test_label_title_is_found(self):
+        self.assertEqual(self.process_title(self.create_client(), "Ostgut Ton - Marcel Dettmann | HÖR - Feb 2 / 2024"), "favorited")
+
+    def test_missing_title_is_not_found_without_the_browser(self):
+        self.assertEqual(self.process_title(self.create_client(), "Nobody Known | HÖR - Jan 1 / 2020"), "not-found")
+        self.assertEqual(self.state.favorites, set())
+
+    def test_failed_request_hands_over_to_the_browser(self):
+        # Without the login cookie the favorite link is refused, the browser has to take over
+        self.assertIsNone(self.process_title(self.create_client(logged_in=False), "Ben Klock | HÖR - Dec 12 / 2023"))
+        self.assertEqual(self.state.favorites, set())
+
+    def test_missing_page_is_classified(self):
+        with self.assertRaises(updater.HoerLiveHttpError) as error:
+            self.create_client().get_page(self.website_url + "sets/unknown/")
+        self.assertEqual(updater.classify_failure(error.exception), "not-found")
+
+if __name__ == "__main__":
+    unittest.main()